@@ -0,0 +1,122 @@
+import itertools
+import weakref
+
+import igraph as ig
+import numpy as np
+from scipy.sparse import csr_matrix
+
+
+class Adjacency(object):
+    """Compressed sparse row snapshot of the distinct neighbors of every node in a graph"""
+
+    def __init__(self, indptr, indices):
+        """Neighbors of vertex v are indices[indptr[v]:indptr[v + 1]]"""
+        self.indptr = indptr
+        self.indices = indices
+        self._edge_index = None
+        self._reverse_index = None
+        self._cache = {}
+
+    @classmethod
+    def from_graph(cls, graph: ig.Graph):
+        """Take a snapshot of a graph, with the same neighbors as set(graph.neighbors(vertex)) minus the vertex"""
+        edges = np.fromiter(itertools.chain.from_iterable(graph.get_edgelist()), dtype=np.int64,
+                            count=2 * graph.ecount())
+        return cls.from_edges(graph.vcount(), edges.reshape(-1, 2))
+
+    @classmethod
+    def from_edges(cls, size, edges):
+        """Build a snapshot from an (m x 2) array of edges, ignoring direction, multi-edges and self-loops"""
+        edges = np.asarray(edges, dtype=np.int64)
+        edges = edges[edges[:, 0] != edges[:, 1]]
+        pairs = np.sort(np.concatenate((edges[:, 0] * size + edges[:, 1], edges[:, 1] * size + edges[:, 0])))
+        distinct = np.ones(len(pairs), dtype=bool)
+        distinct[1:] = pairs[1:] != pairs[:-1]
+        pairs = pairs[distinct]
+        indptr = np.zeros(size + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // size, minlength=size), out=indptr[1:])
+        return cls(indptr, (pairs % size).astype(np.int32))
+
+    def neighbors(self, vertex):
+        """Return the neighbors of a vertex as a view into the snapshot"""
+        return self.indices[self.indptr[vertex]:self.indptr[vertex + 1]]
+
+    def gather(self, vertices):
+        """Return the neighbors of an array of vertices, concatenated"""
+        vertices = np.asarray(vertices, dtype=np.int64)
+        starts = self.indptr[vertices]
+        lengths = self.indptr[vertices + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        return self.indices[offsets + np.arange(len(offsets))]
+
+    def count_neighbors(self, mask):
+        """Return for every vertex the number of its neighbors where a boolean mask over vertices is set"""
+        total = np.zeros(len(self.indices) + 1, dtype=np.int64)
+        np.cumsum(mask[self.indices], out=total[1:])
+        return total[self.indptr[1:]] - total[self.indptr[:-1]]
+
+    def degree(self, vertex=None):
+        """Return the degree of a vertex, of an array of vertices, or of all vertices"""
+        if vertex is None:
+            return np.diff(self.indptr)
+        vertex = np.asarray(vertex, dtype=np.int64)
+        return self.indptr[vertex + 1] - self.indptr[vertex]
+
+    def edge_index(self):
+        """Return the id in range(ecount()) of the undirected edge behind each entry of indices"""
+        if self._edge_index is None:
+            source = np.repeat(np.arange(self.vcount(), dtype=np.int64), self.degree())
+            key = np.minimum(source, self.indices) * self.vcount() + np.maximum(source, self.indices)
+            self._edge_index = np.searchsorted(key[source < self.indices], key)
+        return self._edge_index
+
+    def reverse_index(self):
+        """Return the position in indices of the reverse of each entry, from its neighbor back to its vertex"""
+        if self._reverse_index is None:
+            order = np.argsort(self.edge_index(), kind="stable")
+            self._reverse_index = np.empty(len(order), dtype=np.int64)
+            self._reverse_index[order[0::2]] = order[1::2]
+            self._reverse_index[order[1::2]] = order[0::2]
+        return self._reverse_index
+
+    def cached(self, key, compute):
+        """Return compute(self), computed once per snapshot and key, such as a ranking of the nodes"""
+        if key not in self._cache:
+            self._cache[key] = compute(self)
+        return self._cache[key]
+
+    def matrix(self, dtype=np.float64):
+        """Return the adjacency matrix as a scipy sparse matrix sharing the snapshot's arrays"""
+        data = np.ones(len(self.indices), dtype=dtype)
+        return csr_matrix((data, self.indices, self.indptr), shape=(self.vcount(), self.vcount()))
+
+    def vcount(self):
+        """Return the number of vertices"""
+        return len(self.indptr) - 1
+
+    def ecount(self):
+        """Return the number of edges"""
+        return len(self.indices) // 2
+
+
+_snapshots = {}
+
+
+def as_adjacency(graph):
+    """Return the adjacency snapshot of a graph, reusing it if it is already one
+
+    The snapshot of an igraph graph is kept while the graph lives, so that engines built one after another on the
+    same graph share it along with what is cached on it, such as immunization rankings. It is taken again when the
+    numbers of vertices or edges change; a graph rewired in place without changing them needs Adjacency.from_graph.
+    """
+    if isinstance(graph, Adjacency):
+        return graph
+    counts = graph.vcount(), graph.ecount()
+    if id(graph) in _snapshots:
+        reference, snapshot_counts, snapshot = _snapshots[id(graph)]
+        if reference() is graph and snapshot_counts == counts:
+            return snapshot
+    snapshot = Adjacency.from_graph(graph)
+    _snapshots[id(graph)] = weakref.ref(graph), counts, snapshot
+    weakref.finalize(graph, _snapshots.pop, id(graph), None)
+    return snapshot
@@ -0,0 +1,91 @@
+from __future__ import division
+
+import logging
+
+import igraph as ig
+import numpy as np
+
+from competitive_sir.adjacency import as_adjacency
+from competitive_sir.states import SUSCEPTIBLE, INFECTED, RECOVERED, REMOVED
+
+logger = logging.getLogger(__name__)
+
+
+class BatchReedFrost(object):
+    """Run many independent replicas of the competitive Reed Frost model with immunization at once"""
+
+    def __init__(self, graph: ig.Graph, replicas=50, time_step=(1., 2.01), transmission_rate=(0.1, 0.2),
+                 immunity_rate=0.0, verbose=True, seed=None, profiler=None, seeds=1):
+        """Initialize a (replicas x nodes) state matrix, each row immunized and given seeds nodes per epidemic apart"""
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
+        self.matrix = self.graph.matrix(np.float32)
+        self.replicas = replicas
+        self.time_step = time_step
+        self.transmission_rate = transmission_rate
+        self.verbose = verbose
+        self.profiler = profiler
+
+        size = self.graph.vcount()
+        rows = np.arange(replicas)
+        self.state = np.full((replicas, size), SUSCEPTIBLE, dtype=np.int8)
+        removed = self.rng.integers(size, size=(replicas, int(immunity_rate * size)))
+        self.state[rows[:, None], removed] = REMOVED
+        infected = np.array(list(self.rng.choice(size, size=2 * seeds, replace=False) for _ in rows),
+                            dtype=np.int64).reshape(replicas, 2 * seeds)
+        self.state[rows[:, None], infected[:, :seeds]] = INFECTED[0]
+        self.state[rows[:, None], infected[:, seeds:]] = INFECTED[1]
+
+        self.time = 0.
+        self.next_time = [time_step[0], time_step[1]]
+        self.count = 0
+
+    def run(self):
+        """Run all replicas until no replica has an infected node"""
+        while np.any((self.state == INFECTED[0]) | (self.state == INFECTED[1])):
+            self.time = min(self.next_time)
+            i = 0 if self.time == self.next_time[0] else 1
+            self.next_time[i] += self.time_step[i]
+            if self.profiler is not None:
+                start = self.profiler.clock()
+            self.infection_event(i)
+            self.count += 1
+            if self.profiler is not None:
+                self.profiler.add_time("infection", start)
+                self.profiler.step(self)
+        if self.verbose:
+            logger.info("Mean outbreak size: %.3f %.3f out of %d", self.get_recovered(0).mean(),
+                        self.get_recovered(1).mean(), self.get_all())
+
+    def infection_event(self, i):
+        """Infect susceptible nodes from the infected nodes of epidemic i and recover the latter, in every replica"""
+        active = np.flatnonzero(np.any(self.state == INFECTED[i], axis=1))
+        state = self.state[active]
+        infected = state == INFECTED[i]
+        exposure = (self.matrix @ infected.T.astype(np.float32)).T
+        targets = np.nonzero((exposure > 0) & (state == SUSCEPTIBLE))
+        escape = (1 - self.transmission_rate[i]) ** exposure[targets]
+        newly_infected = self.rng.random(len(escape)) > escape
+        if self.profiler is not None:
+            self.profiler.add("replicas", len(active))
+            self.profiler.add("infections", int(np.count_nonzero(newly_infected)))
+            self.profiler.add("recoveries", int(np.count_nonzero(infected)))
+        state[infected] = RECOVERED[i]
+        state[targets[0][newly_infected], targets[1][newly_infected]] = INFECTED[i]
+        self.state[active] = state
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.graph.vcount()
+
+    def get_susceptible(self):
+        """Return the number of susceptible nodes of each replica at a time"""
+        return np.count_nonzero(self.state == SUSCEPTIBLE, axis=1)
+
+    def get_infected(self, i):
+        """Return the number of infected nodes of each replica at a time"""
+        return np.count_nonzero(self.state == INFECTED[i], axis=1)
+
+    def get_recovered(self, i):
+        """Return the number of recovered nodes of each replica at a time"""
+        return np.count_nonzero(self.state == RECOVERED[i], axis=1)
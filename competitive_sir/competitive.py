@@ -1,24 +1,61 @@
 from __future__ import division
 
-import random
+import heapq
+import logging
 
 import igraph as ig
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.integrate import odeint
-from copy import copy
+from scipy.integrate import RK45, odeint, solve_ivp
+
+from competitive_sir import kernels
+from competitive_sir.adjacency import as_adjacency
+from competitive_sir.history import History, CompetitiveHistoryMixin
+from competitive_sir.states import SUSCEPTIBLE, INFECTED, RECOVERED, REMOVED
+from competitive_sir.streaming import Snapshot
+
+logger = logging.getLogger(__name__)
+
+
+def competitive_deriv(t, y, n, beta1, beta2, gamma1, gamma2):
+    """Return the derivatives of the mean field model, for one or many parameter sets stacked by compartment"""
+    s, i1, i2, r1, r2 = np.reshape(y, (5, -1))
+    infection1 = beta1 * s * i1 / n
+    infection2 = beta2 * s * i2 / n
+    return np.concatenate((-infection1 - infection2, infection1 - gamma1 * i1, infection2 - gamma2 * i2, gamma1 * i1,
+                           gamma2 * i2))
+
+
+def extinction_event(extinction):
+    """Return a terminal event for solve_ivp, triggered once every parameter set has fewer infected than extinction"""
+
+    def extinct(t, y, *rates):
+        s, i1, i2, r1, r2 = np.reshape(y, (5, -1))
+        return np.max(i1 + i2) - extinction
+
+    extinct.terminal = True
+    extinct.direction = -1
+    return extinct
 
 
 class SirODE(object):
     """Using ODE to solve sir model"""
 
     def __init__(self, size=10000, infection_rate=(0.02, 0.03), recover_rate=(0.01, 0.01), stop_time=None,
-                 verbose=True):
-        """Initialize the graph"""
+                 verbose=True, adaptive=False, grid=None, extinction=0.5, profiler=None):
+        """Initialize the graph
+
+        With adaptive, the model is solved by solve_ivp, keeping its own steps or the requested grid, and stops once
+        fewer than extinction nodes are infected.
+        """
         self.size = size
         self.infection_rate1, self.infection_rate2 = infection_rate
         self.recover_rate1, self.recover_rate2 = recover_rate
         self.verbose = verbose
+        self.adaptive = adaptive
+        self.grid = grid
+        self.extinction = extinction
+        self.profiler = profiler
         if stop_time is None:
             self.stop_time = 10000
         else:
@@ -40,8 +77,51 @@ class SirODE(object):
 
         y0 = (self.size - 2, 1, 1, 0, 0)
 
-        self.time_history = np.linspace(0, self.stop_time, 100000)
-        self.history = odeint(deriv, y0, self.time_history)
+        if self.profiler is not None:
+            start = self.profiler.clock()
+        if self.adaptive:
+            solution = solve_ivp(competitive_deriv, (0, self.stop_time), y0, t_eval=self.grid,
+                                 events=extinction_event(self.extinction), rtol=1e-8, atol=1e-6,
+                                 args=(self.size, self.infection_rate1, self.infection_rate2, self.recover_rate1,
+                                       self.recover_rate2))
+            self.time_history = solution.t
+            self.history = solution.y.T
+        else:
+            self.time_history = np.linspace(0, self.stop_time, 100000)
+            self.history = odeint(deriv, y0, self.time_history)
+        if self.profiler is not None:
+            self.profiler.add_time("solve", start)
+            self.profiler.add("points", len(self.time_history))
+            self.profiler.step(self)
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every step of an adaptive solver, until fewer than extinction nodes are infected,
+        stop_time is reached or stop(model, snapshot) holds
+
+        The steps taken are kept in time_history and history, as after run.
+        """
+        rates = self.size, self.infection_rate1, self.infection_rate2, self.recover_rate1, self.recover_rate2
+        solver = RK45(lambda t, y: competitive_deriv(t, y, *rates), 0, (self.size - 2., 1., 1., 0., 0.),
+                      self.stop_time, rtol=1e-8, atol=1e-6)
+        time_history, history = [solver.t], [solver.y]
+        count = 0
+        try:
+            while solver.status == "running":
+                solver.step()
+                count += 1
+                time_history.append(solver.t)
+                history.append(solver.y)
+                s, i1, i2, r1, r2 = solver.y.tolist()
+                snapshot = Snapshot(count, float(solver.t), s, (i1, i2), (r1, r2))
+                yield snapshot
+                if i1 + i2 < self.extinction or (stop is not None and stop(self, snapshot)):
+                    break
+        finally:
+            self.time_history, self.history = np.array(time_history), np.array(history)
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.size
 
     def plot(self):
         """Plot the graph w.r.t. the time"""
@@ -55,77 +135,373 @@ class SirODE(object):
         plt.show()
 
 
-class SirReedFrost(object):
-    """Using Reed Frost to solve sir model"""
+class SirODEBatch(object):
+    """Using ODE to solve sir model for many parameter sets at once, as one system"""
+
+    def __init__(self, size=10000, infection_rate=(0.02, 0.03), recover_rate=(0.01, 0.01), stop_time=None,
+                 verbose=True, grid=None, extinction=0.5, profiler=None):
+        """Initialize the model with arrays of infection and recover rates, broadcast against each other"""
+        self.size = size
+        self.infection_rate1, self.infection_rate2, self.recover_rate1, self.recover_rate2 = np.broadcast_arrays(
+            *(np.atleast_1d(np.asarray(rate, dtype=np.float64)) for rate in infection_rate + recover_rate))
+        self.verbose = verbose
+        self.grid = grid
+        self.extinction = extinction
+        self.profiler = profiler
+        if stop_time is None:
+            self.stop_time = 10000
+        else:
+            self.stop_time = stop_time
+
+    def run(self):
+        """Run the model until every parameter set dies out, or until stop_time"""
+        sets = self.infection_rate1.size
+        rates = tuple(rate.ravel() for rate in (self.infection_rate1, self.infection_rate2, self.recover_rate1,
+                                                self.recover_rate2))
+        y0 = np.concatenate((np.full(sets, self.size - 2.), np.ones(sets), np.ones(sets), np.zeros(sets),
+                             np.zeros(sets)))
+        if self.profiler is not None:
+            start = self.profiler.clock()
+        solution = solve_ivp(competitive_deriv, (0, self.stop_time), y0, t_eval=self.grid,
+                             events=extinction_event(self.extinction), rtol=1e-8, atol=1e-6, args=(self.size,) + rates)
+        self.time_history = solution.t
+        self.history = solution.y.reshape((5,) + self.infection_rate1.shape + (-1,))
+        final = solution.y_events[0][0] if len(solution.t_events[0]) else solution.y[:, -1]
+        self.final = final.reshape((5,) + self.infection_rate1.shape)
+        if self.profiler is not None:
+            self.profiler.add_time("solve", start)
+            self.profiler.add("evaluations", solution.nfev)
+            self.profiler.step(self)
+        if self.verbose:
+            logger.info("Solved %d parameter sets up to time %g", sets, self.time_history[-1])
+
+    def steps(self, stop=None):
+        """Yield a snapshot of every parameter set after every step of an adaptive solver, until every set has fewer
+        than extinction nodes infected, stop_time is reached or stop(model, snapshot) holds for every set
+
+        The steps taken are kept in time_history and history, and the last one in final, as after run.
+        """
+        sets = self.infection_rate1.size
+        rates = tuple(rate.ravel() for rate in (self.infection_rate1, self.infection_rate2, self.recover_rate1,
+                                                self.recover_rate2))
+        y0 = np.concatenate((np.full(sets, self.size - 2.), np.ones(sets), np.ones(sets), np.zeros(sets),
+                             np.zeros(sets)))
+        solver = RK45(lambda t, y: competitive_deriv(t, y, self.size, *rates), 0, y0, self.stop_time, rtol=1e-8,
+                      atol=1e-6)
+        shape = (5,) + self.infection_rate1.shape
+        time_history, history = [solver.t], [solver.y]
+        count = 0
+        try:
+            while solver.status == "running":
+                solver.step()
+                count += 1
+                time_history.append(solver.t)
+                history.append(solver.y)
+                s, i1, i2, r1, r2 = solver.y.reshape(shape)
+                snapshot = Snapshot(count, float(solver.t), s, (i1, i2), (r1, r2))
+                yield snapshot
+                if np.max(i1 + i2) < self.extinction or (stop is not None and np.all(stop(self, snapshot))):
+                    break
+        finally:
+            self.time_history = np.array(time_history)
+            self.history = np.stack(history, axis=-1).reshape(shape + (-1,))
+            self.final = history[-1].reshape(shape)
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.size
+
+    def get_susceptible(self):
+        """Return the final number of susceptible nodes of every parameter set"""
+        return self.final[0]
 
-    def __init__(self, graph: ig.Graph, time_step=(1., 2.), transmission_rate=(0.1, 0.2), verbose=True):
-        self.graph = graph
+    def get_infected(self, i):
+        """Return the final number of infected nodes of every parameter set"""
+        return self.final[1 + i]
+
+    def get_recovered(self, i):
+        """Return the final number of recovered nodes of every parameter set"""
+        return self.final[3 + i]
+
+
+class SirReedFrost(CompetitiveHistoryMixin):
+    """Using Reed Frost to solve sir model
+
+    The state of every node is kept in a uint8 array with the codes of the states module, and the number of nodes in
+    every state in counts, so that the getters take constant time. When numba is installed, every generation runs in
+    the compiled frontier kernel; otherwise frontier picks between the numpy frontier and scan generations.
+    """
+
+    def __init__(self, graph: ig.Graph, time_step=(1., 2.), transmission_rate=(0.1, 0.2), verbose=True,
+                 frontier=False, recording=None, seed=None, profiler=None, compiled=None, seeds=1):
+        """Start each epidemic from seeds distinct random nodes"""
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
         self.time_step = time_step
         self.transmission_rate = transmission_rate
         self.verbose = verbose
-        infected1, infected2 = random.sample(list(self.graph.vs.indices), k=2)
-        self.infected = [{infected1}, {infected2}]
-        self.recovered = [set(), set()]
-        self.susceptible = set(self.graph.vs.indices).difference(self.infected[0]).difference(
-            self.infected[1])
+        self.frontier = frontier
+        self.profiler = profiler
+        infected = self.rng.choice(self.graph.vcount(), size=2 * seeds, replace=False).astype(np.int64)
+        self.active = [infected[:seeds], infected[seeds:]]
+        self.state = np.full(self.graph.vcount(), SUSCEPTIBLE, dtype=np.uint8)
+        self.state[self.active[0]], self.state[self.active[1]] = INFECTED
+        self.counts = [self.graph.vcount() - 2 * seeds, seeds, seeds, 0, 0, 0]
+        self.compiled = kernels.use_compiled(compiled)
+        if self.compiled:
+            self.exposure = np.zeros(self.graph.vcount(), dtype=np.int32)
+            self.kernel_rng = kernels.rng_state(self.rng)
         self.time = 0.
+        self.count = 0
         self.next_time = [time_step[0], time_step[1]]
-        self.time_history = [0.]
-        self.susceptible_history = [self.get_susceptible()]
-        self.infected_history = [self.get_infected(0)], [self.get_infected(1)]
-        self.recovered_history = [self.get_recovered(0)], [self.get_recovered(1)]
+        self.recorder = History(("susceptible", "infected0", "infected1", "recovered0", "recovered1"), recording)
+        self.record()
 
-    def run(self):
-        """Run the simulation"""
-        while len(self.infected[0]) > 0 or len(self.infected[1]) > 0:
-            self.time = min(self.next_time)
-            i = 0 if self.time == self.next_time[0] else 1
-            self.next_time[i] += self.time_step[i]
-            infected_set = set()
-            for vertex in self.susceptible:
-                self.infection_event(vertex, infected_set, i)
-
-            if self.verbose:
-                print("Node", infected_set, "are infected.")
-            self.susceptible.difference_update(infected_set)
-            self.recovered[i].update(self.infected[i])
-
-            if self.verbose:
-                print("Node", self.infected[i], "have recovered.")
-            self.infected[i] = infected_set
-
-            self.time_history.append(copy(self.time))
-            self.susceptible_history.append(self.get_susceptible())
-            for i in (0, 1):
-                self.infected_history[i].append(self.get_infected(i))
-                self.recovered_history[i].append(self.get_recovered(i))
-            if self.verbose:
-                print("Proportion of five types: {:.3f} {:.3f} {:.3f} {:.3f} {:.3f} ".format(
-                    self.get_susceptible() / self.get_all(),
-                    self.get_infected(0) / self.get_all(),
-                    self.get_infected(1) / self.get_all(),
-                    self.get_recovered(0) / self.get_all(),
-                    self.get_recovered(1) / self.get_all()))
-        if self.verbose:
-            print("Outbreak size:", self.get_recovered(0), self.get_recovered(1), "out of", self.get_all())
+    def run(self, stop=None):
+        """Run the simulation, until no node is infected or stop(model, snapshot) holds"""
+        for _ in self.steps(stop):
+            pass
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every generation, until no node is infected or stop(model, snapshot) holds"""
+        profiler = self.profiler
+        try:
+            while self.counts[INFECTED[0]] > 0 or self.counts[INFECTED[1]] > 0:
+                self.time = min(self.next_time)
+                i = 0 if self.time == self.next_time[0] else 1
+                self.next_time[i] += self.time_step[i]
+                scan = not (self.frontier or self.compiled)
+                if profiler is not None:
+                    profiler.add("vertices", self.get_all() if scan else len(self.active[i]))
+                    profiler.add("edges", len(self.graph.indices) if scan else
+                                 int(self.graph.degree(self.active[i]).sum()))
+                    start = profiler.clock()
+                if self.compiled:
+                    newly_infected = kernels.infect_frontier(self.graph.indptr, self.graph.indices, self.state,
+                                                             self.active[i], 1 - self.transmission_rate[i],
+                                                             self.exposure, self.kernel_rng)
+                elif self.frontier:
+                    newly_infected = self.frontier_event(i)
+                else:
+                    newly_infected = self.scan_event(i)
+                if profiler is not None:
+                    start = profiler.add_time("infection", start)
+                    profiler.add("infections", len(newly_infected))
+                    profiler.add("recoveries", len(self.active[i]))
 
+                if self.verbose:
+                    logger.debug("Nodes %s are infected by %d.", newly_infected, i)
+                    logger.debug("Nodes %s have recovered from %d.", self.active[i], i)
+                self.state[self.active[i]] = RECOVERED[i]
+                self.state[newly_infected] = INFECTED[i]
+                self.counts[SUSCEPTIBLE] -= len(newly_infected)
+                self.counts[RECOVERED[i]] += len(self.active[i])
+                self.counts[INFECTED[i]] = len(newly_infected)
+                self.active[i] = newly_infected
+                if profiler is not None:
+                    start = profiler.add_time("update", start)
 
-    def infection_event(self, vertex, infected_ls, i):
+                self.count += 1
+                self.record()
+                if profiler is not None:
+                    profiler.add_time("record", start)
+                    profiler.step(self)
+                if self.verbose:
+                    logger.info("Proportion of five types: %.3f %.3f %.3f %.3f %.3f",
+                                self.get_susceptible() / self.get_all(), self.get_infected(0) / self.get_all(),
+                                self.get_infected(1) / self.get_all(), self.get_recovered(0) / self.get_all(),
+                                self.get_recovered(1) / self.get_all())
+                snapshot = self.snapshot()
+                yield snapshot
+                if stop is not None and stop(self, snapshot):
+                    break
+        finally:
+            self.recorder.finish()
+        if self.verbose:
+            logger.info("Outbreak size: %d %d out of %d", self.get_recovered(0), self.get_recovered(1), self.get_all())
+
+    def infection_event(self, vertex, infected_ls, i, rand=None):
         """If vertex is infected, push it into the list"""
-        infected_neighbors = len(self.infected[i].intersection(self.graph.neighbors(vertex)))
-        rand = random.random()
+        infected_neighbors = np.count_nonzero(self.state[self.graph.neighbors(vertex)] == INFECTED[i])
+        if rand is None:
+            rand = self.rng.random()
         if rand > (1 - self.transmission_rate[i]) ** infected_neighbors:
             infected_ls.add(vertex)
 
+    def scan_event(self, i):
+        """Return the susceptible nodes that get infected by epidemic i, testing every susceptible node"""
+        exposure = self.graph.count_neighbors(self.state == INFECTED[i])
+        candidates = np.flatnonzero(self.state == SUSCEPTIBLE)
+        rand = self.rng.random(len(candidates))
+        return candidates[rand > (1 - self.transmission_rate[i]) ** exposure[candidates]]
+
+    def frontier_event(self, i):
+        """Return the susceptible neighbors of the infected nodes that get infected by epidemic i"""
+        return kernels.infect_frontier_numpy(self.graph, self.state, self.active[i], 1 - self.transmission_rate[i],
+                                             self.rng)
+
     def recover_event(self, vertex, recover_ls, recover_time):
         """Recover a vertex after some time"""
         for i in (0, 1):
             if recover_time[i][vertex] == self.time:
                 recover_ls[i].append(vertex)
 
+    def record(self):
+        """Record the current counts of both epidemics"""
+        self.recorder.record(self.count, self.time, self.get_susceptible(), self.get_infected(0),
+                             self.get_infected(1), self.get_recovered(0), self.get_recovered(1))
+
+    def snapshot(self):
+        """Return the current counts of both epidemics as a snapshot"""
+        return Snapshot(self.count, self.time, self.get_susceptible(), (self.get_infected(0), self.get_infected(1)),
+                        (self.get_recovered(0), self.get_recovered(1)))
+
+    def nodes(self, code):
+        """Return the set of nodes in a state, built from the state array"""
+        return set(np.flatnonzero(self.state == code).tolist())
+
+    @property
+    def susceptible(self):
+        return self.nodes(SUSCEPTIBLE)
+
+    @property
+    def infected(self):
+        return [self.nodes(INFECTED[0]), self.nodes(INFECTED[1])]
+
+    @property
+    def recovered(self):
+        return [self.nodes(RECOVERED[0]), self.nodes(RECOVERED[1])]
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.graph.vcount()
+
+    def get_susceptible(self):
+        """Return the number of susceptible nodes at a time"""
+        return self.counts[SUSCEPTIBLE]
+
+    def get_infected(self, i):
+        """Return the number of infected nodes at a time"""
+        return self.counts[INFECTED[i]]
+
+    def get_recovered(self, i):
+        """Return the number of recovered nodes at a time"""
+        return self.counts[RECOVERED[i]]
+
+    def plot(self):
+        """Plot the sir process w.r.t. time"""
+        plt.plot(self.time_history, self.susceptible_history, label="Susceptible")
+        plt.plot(self.time_history, self.infected_history[0], label="Infected by 0")
+        plt.plot(self.time_history, self.infected_history[1], label="Infected by 1")
+        plt.plot(self.time_history, self.recovered_history[0], label="Recovered from 0")
+        plt.plot(self.time_history, self.recovered_history[1], label="Recovered from 1")
+        plt.legend()
+        plt.show()
+
+
+class SirNextReaction(CompetitiveHistoryMixin):
+    """Event driven competitive sir model on a network, with exponential transmission and recovery times"""
+
+    INFECT, RECOVER = 0, 1
+
+    def __init__(self, graph: ig.Graph, infection_rate=(0.002, 0.003), recover_rate=(0.01, 0.01), verbose=True,
+                 recording=None, seed=None, profiler=None, seeds=1):
+        """Initialize a model with per-edge infection rates and per-node recover rates of both epidemics
+
+        Each epidemic starts from seeds distinct random nodes.
+        """
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
+        self.infection_rate = infection_rate
+        self.recover_rate = recover_rate
+        self.verbose = verbose
+        self.profiler = profiler
+        infected = self.rng.choice(self.graph.vcount(), size=2 * seeds, replace=False).tolist()
+        self.infected = [set(infected[:seeds]), set(infected[seeds:])]
+        self.recovered = [set(), set()]
+        self.susceptible = set(range(self.graph.vcount())).difference(self.infected[0]).difference(
+            self.infected[1])
+        self.time = 0.
+        self.count = 0
+        self.events = []
+        for i in (0, 1):
+            for vertex in self.infected[i]:
+                self.schedule(vertex, i)
+        self.recorder = History(("susceptible", "infected0", "infected1", "recovered0", "recovered1"), recording)
+        self.record()
+
+    def schedule(self, vertex, i):
+        """Draw when a newly infected vertex recovers, and which of its transmissions happen before that"""
+        recover_time = self.time + self.rng.exponential(1 / self.recover_rate[i])
+        heapq.heappush(self.events, (recover_time, self.RECOVER, vertex, i))
+        targets = list(target for target in self.graph.neighbors(vertex).tolist() if target in self.susceptible)
+        delays = self.rng.exponential(1 / self.infection_rate[i], size=len(targets)).tolist()
+        for target, delay in zip(targets, delays):
+            if self.time + delay < recover_time:
+                heapq.heappush(self.events, (self.time + delay, self.INFECT, target, i))
+
+    def run(self, stop=None):
+        """Run the simulation, until no node is infected or stop(model, snapshot) holds"""
+        for _ in self.steps(stop):
+            pass
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every event, until no node is infected or stop(model, snapshot) holds"""
+        profiler = self.profiler
+        try:
+            while len(self.infected[0]) > 0 or len(self.infected[1]) > 0:
+                if profiler is not None:
+                    start = profiler.clock()
+                time, event, vertex, i = heapq.heappop(self.events)
+                if event == self.INFECT:
+                    if vertex not in self.susceptible:
+                        if profiler is not None:
+                            profiler.add("stale")
+                            profiler.add_time("schedule", start)
+                        continue
+                    self.time = time
+                    self.susceptible.remove(vertex)
+                    self.infected[i].add(vertex)
+                    self.schedule(vertex, i)
+                else:
+                    self.time = time
+                    self.infected[i].remove(vertex)
+                    self.recovered[i].add(vertex)
+                if profiler is not None:
+                    start = profiler.add_time("schedule", start)
+                    profiler.add("infections" if event == self.INFECT else "recoveries")
+                    if event == self.INFECT:
+                        profiler.add("edges", int(self.graph.degree(vertex)))
+                self.count += 1
+                self.record()
+                if profiler is not None:
+                    profiler.add_time("record", start)
+                    profiler.step(self)
+                if self.verbose:
+                    logger.debug("Node %d %s %d", vertex,
+                                 "is infected by" if event == self.INFECT else "has recovered from", i)
+                snapshot = self.snapshot()
+                yield snapshot
+                if stop is not None and stop(self, snapshot):
+                    break
+        finally:
+            self.recorder.finish()
+        if self.verbose:
+            logger.info("Outbreak size: %d %d out of %d", self.get_recovered(0), self.get_recovered(1), self.get_all())
+
+    def record(self):
+        """Record the current counts of both epidemics"""
+        self.recorder.record(self.count, self.time, self.get_susceptible(), self.get_infected(0),
+                             self.get_infected(1), self.get_recovered(0), self.get_recovered(1))
+
+    def snapshot(self):
+        """Return the current counts of both epidemics as a snapshot"""
+        return Snapshot(self.count, self.time, self.get_susceptible(), (self.get_infected(0), self.get_infected(1)),
+                        (self.get_recovered(0), self.get_recovered(1)))
+
     def get_all(self):
         """Return the number of all nodes"""
-        return len(self.graph.vs)
+        return self.graph.vcount()
 
     def get_susceptible(self):
         """Return the number of susceptible nodes at a time"""
@@ -153,13 +529,205 @@ class SirReedFrost(object):
 class ImmunizationReedFrost(SirReedFrost):
     """Immunized Reed Frost model"""
     def __init__(self, graph: ig.Graph, time_step=(1., 2.01), transmission_rate=(0.1, 0.2), immunity_rate=0.0,
-                 verbose=True):
-        super(ImmunizationReedFrost, self).__init__(graph, time_step, transmission_rate, verbose)
-        self.removed = set()
-        self.removed.update(random.choices(self.graph.vs.indices, k=int(immunity_rate * len(self.graph.vs.indices))))
-        self.removed.difference_update(self.infected[0])
-        self.removed.difference_update(self.infected[1])
-        self.susceptible.difference_update(self.removed)
-        self.susceptible_history = [self.get_susceptible()]
-        self.infected_history = [self.get_infected(0)], [self.get_infected(1)]
-        self.recovered_history = [self.get_recovered(0)], [self.get_recovered(1)]
+                 verbose=True, frontier=False, recording=None, seed=None, profiler=None, compiled=None, seeds=1,
+                 strategy=None):
+        """Immunize int(immunity_rate * n) nodes other than the seeds, picked by an immunization strategy
+
+        Without a strategy, int(immunity_rate * n) nodes are drawn with replacement and the seeds among them are
+        spared, as in the batch and percolation engines, so fewer nodes end up immunized.
+        """
+        super(ImmunizationReedFrost, self).__init__(graph, time_step, transmission_rate, verbose, frontier, recording,
+                                                    seed, profiler, compiled, seeds)
+        count = int(immunity_rate * self.graph.vcount())
+        if strategy is None:
+            immunized = self.rng.integers(self.graph.vcount(), size=count)
+            immunized = immunized[self.state[immunized] == SUSCEPTIBLE]
+        else:
+            immunized = strategy.select(self.graph, count, self.rng, np.concatenate(self.active))
+        self.state[immunized] = REMOVED
+        self.counts[REMOVED] = int(np.count_nonzero(self.state == REMOVED))
+        self.counts[SUSCEPTIBLE] -= self.counts[REMOVED]
+        self.recorder.clear()
+        self.record()
+
+    @property
+    def removed(self):
+        return self.nodes(REMOVED)
+
+
+class SirMultiReedFrost(CompetitiveHistoryMixin):
+    """Immunized Reed Frost model of any number of competing epidemics, each with its own time step and rate
+
+    The next tick of every epidemic is kept in a heap of (time, epidemic), and an epidemic leaves the heap once it
+    has no infected node. The epidemics ticking at the same time fire in one pass over their combined frontier, a
+    node infected by several of them going to the lowest-numbered one, as if they had fired one after another in
+    order like in SirReedFrost. state holds SUSCEPTIBLE, INFECTED[0], RECOVERED[0] or REMOVED for every node, and
+    owner the epidemic that infected it.
+    """
+
+    def __init__(self, graph: ig.Graph, time_step=(1., 2.01, 3.02), transmission_rate=(0.1, 0.2, 0.3),
+                 immunity_rate=0.0, verbose=True, recording=None, seed=None, profiler=None, compiled=None, seeds=1,
+                 strategy=None):
+        """Start each epidemic from seeds distinct random nodes, and immunize int(immunity_rate * n) other nodes"""
+        if len(time_step) != len(transmission_rate):
+            raise ValueError("Every epidemic needs one time step and one transmission rate")
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
+        self.time_step = time_step
+        self.transmission_rate = transmission_rate
+        self.escape = 1 - np.asarray(transmission_rate, dtype=np.float64)
+        self.epidemics = len(time_step)
+        self.verbose = verbose
+        self.profiler = profiler
+        size = self.graph.vcount()
+        infected = self.rng.choice(size, size=self.epidemics * seeds, replace=False).astype(np.int64)
+        self.active = list(infected[i * seeds:(i + 1) * seeds] for i in range(self.epidemics))
+        self.state = np.full(size, SUSCEPTIBLE, dtype=np.uint8)
+        self.state[infected] = INFECTED[0]
+        self.owner = np.full(size, -1, dtype=np.int16)
+        self.owner[infected] = np.repeat(np.arange(self.epidemics), seeds)
+        count = int(immunity_rate * size)
+        if strategy is None:
+            immunized = self.rng.integers(size, size=count)
+            immunized = immunized[self.state[immunized] == SUSCEPTIBLE]
+        else:
+            immunized = strategy.select(self.graph, count, self.rng, infected)
+        self.state[immunized] = REMOVED
+        self.removed_count = int(np.count_nonzero(self.state == REMOVED))
+        self.susceptible_count = size - len(infected) - self.removed_count
+        self.infected_counts = [seeds] * self.epidemics
+        self.recovered_counts = [0] * self.epidemics
+        self.compiled = kernels.use_compiled(compiled)
+        if self.compiled:
+            self.exposure = np.zeros(size, dtype=np.int32)
+            self.kernel_rng = kernels.rng_state(self.rng)
+        self.time = 0.
+        self.count = 0
+        self.ticks = list((time_step[i], i) for i in range(self.epidemics))
+        heapq.heapify(self.ticks)
+        self.recorder = History(("susceptible",) + tuple("infected%d" % i for i in range(self.epidemics)) +
+                                tuple("recovered%d" % i for i in range(self.epidemics)), recording)
+        self.record()
+
+    def run(self, stop=None):
+        """Run the simulation, until no node is infected or stop(model, snapshot) holds"""
+        for _ in self.steps(stop):
+            pass
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every tick, until no node is infected or stop(model, snapshot) holds"""
+        profiler = self.profiler
+        try:
+            while self.ticks:
+                self.time = self.ticks[0][0]
+                group = []
+                while self.ticks and self.ticks[0][0] == self.time:
+                    group.append(heapq.heappop(self.ticks)[1])
+                if profiler is not None:
+                    profiler.add("vertices", sum(len(self.active[i]) for i in group))
+                    profiler.add("edges", sum(int(self.graph.degree(self.active[i]).sum()) for i in group))
+                    start = profiler.clock()
+                infections = self.group_event(group)
+                if profiler is not None:
+                    start = profiler.add_time("infection", start)
+                    profiler.add("infections", sum(len(newly_infected) for newly_infected in infections))
+                    profiler.add("recoveries", sum(len(self.active[i]) for i in group))
+
+                for i, newly_infected in zip(group, infections):
+                    if self.verbose:
+                        logger.debug("Nodes %s are infected by %d.", newly_infected, i)
+                        logger.debug("Nodes %s have recovered from %d.", self.active[i], i)
+                    self.state[self.active[i]] = RECOVERED[0]
+                    self.state[newly_infected] = INFECTED[0]
+                    self.owner[newly_infected] = i
+                    self.susceptible_count -= len(newly_infected)
+                    self.recovered_counts[i] += len(self.active[i])
+                    self.infected_counts[i] = len(newly_infected)
+                    self.active[i] = newly_infected
+                    if len(newly_infected):
+                        heapq.heappush(self.ticks, (self.time + self.time_step[i], i))
+                if profiler is not None:
+                    start = profiler.add_time("update", start)
+
+                self.count += 1
+                self.record()
+                if profiler is not None:
+                    profiler.add_time("record", start)
+                    profiler.step(self)
+                if self.verbose:
+                    logger.info("Proportion of susceptible nodes: %.3f, infected: %s, recovered: %s",
+                                self.get_susceptible() / self.get_all(),
+                                " ".join("%.3f" % (count / self.get_all()) for count in self.infected_counts),
+                                " ".join("%.3f" % (count / self.get_all()) for count in self.recovered_counts))
+                snapshot = self.snapshot()
+                yield snapshot
+                if stop is not None and stop(self, snapshot):
+                    break
+        finally:
+            self.recorder.finish()
+        if self.verbose:
+            logger.info("Outbreak sizes: %s out of %d", " ".join(map(str, self.recovered_counts)), self.get_all())
+
+    def group_event(self, group):
+        """Return the susceptible nodes infected by each epidemic of a group ticking at the same time"""
+        if self.compiled and len(group) == 1:
+            i = group[0]
+            return [kernels.infect_frontier(self.graph.indptr, self.graph.indices, self.state, self.active[i],
+                                            self.escape[i], self.exposure, self.kernel_rng)]
+        width = len(group)
+        sources = np.concatenate(list(self.active[i] for i in group))
+        labels = np.repeat(np.arange(width), list(len(self.active[i]) for i in group))
+        targets = self.graph.gather(sources)
+        labels = np.repeat(labels, self.graph.degree(sources))
+        susceptible = self.state[targets] == SUSCEPTIBLE
+        keys = np.sort(targets[susceptible] * width + labels[susceptible])
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] != keys[:-1]
+        starts = np.flatnonzero(first)
+        exposure = np.diff(np.append(starts, len(keys)))
+        keys = keys[starts]
+        keys = keys[self.rng.random(len(keys)) > self.escape[group][keys % width] ** exposure]
+        # keys are sorted by node, then by epidemic, so the first key of a node is the lowest epidemic infecting it
+        first = np.ones(len(keys), dtype=bool)
+        first[1:] = keys[1:] // width != keys[:-1] // width
+        keys = keys[first]
+        return list(keys[keys % width == label] // width for label in range(width))
+
+    def record(self):
+        """Record the current counts of every epidemic"""
+        self.recorder.record(self.count, self.time, self.get_susceptible(), *(self.infected_counts +
+                                                                              self.recovered_counts))
+
+    def snapshot(self):
+        """Return the current counts of every epidemic as a snapshot"""
+        return Snapshot(self.count, self.time, self.get_susceptible(), tuple(self.infected_counts),
+                        tuple(self.recovered_counts))
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.graph.vcount()
+
+    def get_susceptible(self):
+        """Return the number of susceptible nodes at a time"""
+        return self.susceptible_count
+
+    def get_infected(self, i):
+        """Return the number of nodes infected by epidemic i at a time"""
+        return self.infected_counts[i]
+
+    def get_recovered(self, i):
+        """Return the number of nodes recovered from epidemic i at a time"""
+        return self.recovered_counts[i]
+
+    def get_removed(self):
+        """Return the number of immunized nodes"""
+        return self.removed_count
+
+    def plot(self):
+        """Plot the sir process w.r.t. time"""
+        plt.plot(self.time_history, self.susceptible_history, label="Susceptible")
+        for i in range(self.epidemics):
+            plt.plot(self.time_history, self.infected_history[i], label="Infected by %d" % i)
+            plt.plot(self.time_history, self.recovered_history[i], label="Recovered from %d" % i)
+        plt.legend()
+        plt.show()
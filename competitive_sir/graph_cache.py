@@ -0,0 +1,59 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import igraph as ig
+import numpy as np
+
+from competitive_sir.adjacency import Adjacency
+from competitive_sir.property import get_threhsold
+
+
+def cache_key(filename):
+    """Return the cache key of a network file, made of its absolute path, modification time and size"""
+    status = os.stat(filename)
+    key = "{}:{}:{}".format(os.path.abspath(filename), status.st_mtime_ns, status.st_size)
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def store_network(filename, cache_dir):
+    """Parse a network file and store its edges, adjacency snapshot and degree statistics in the cache"""
+    graph = ig.Graph.Load(filename)
+    adjacency = Adjacency.from_graph(graph)
+    degree = np.array(graph.degree(), dtype=np.int64)
+    stats = {"nodes": graph.vcount(), "edges": graph.ecount(), "directed": graph.is_directed(),
+             "mean_degree": float(degree.mean()) if len(degree) else 0.,
+             "mean_squared_degree": float((degree ** 2).mean()) if len(degree) else 0.,
+             "threshold": get_threhsold(graph)}
+
+    os.makedirs(cache_dir, exist_ok=True)
+    target = os.path.join(cache_dir, cache_key(filename))
+    staging = tempfile.mkdtemp(dir=cache_dir)
+    np.save(os.path.join(staging, "edges.npy"), np.array(graph.get_edgelist(), dtype=np.int64).reshape(-1, 2))
+    np.save(os.path.join(staging, "indptr.npy"), adjacency.indptr)
+    np.save(os.path.join(staging, "indices.npy"), adjacency.indices)
+    np.save(os.path.join(staging, "degree.npy"), degree)
+    with open(os.path.join(staging, "stats.json"), "w") as out:
+        json.dump(stats, out)
+    try:
+        os.rename(staging, target)
+    except OSError:
+        shutil.rmtree(staging)
+
+
+def load_network(filename, cache_dir):
+    """Return the memory-mapped edges and adjacency snapshot and the statistics of a network file
+
+    The file is parsed on the first call only; later calls open the cached arrays until the file changes.
+    """
+    target = os.path.join(cache_dir, cache_key(filename))
+    if not os.path.exists(target):
+        store_network(filename, cache_dir)
+    with open(os.path.join(target, "stats.json")) as stats_file:
+        stats = json.load(stats_file)
+    edges = np.load(os.path.join(target, "edges.npy"), mmap_mode="r")
+    adjacency = Adjacency(np.load(os.path.join(target, "indptr.npy"), mmap_mode="r"),
+                          np.load(os.path.join(target, "indices.npy"), mmap_mode="r"))
+    return edges, adjacency, stats
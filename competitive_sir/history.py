@@ -0,0 +1,167 @@
+from copy import copy
+
+import numpy as np
+
+
+class EveryEvent(object):
+    """Record the state after every event"""
+
+    def record(self, history, step, time, values):
+        history.append(step, time, values)
+
+    def finish(self, history, step, time, values):
+        pass
+
+
+class EveryKth(object):
+    """Record the state after every k-th event, and the final state"""
+
+    def __init__(self, k):
+        self.k = k
+
+    def record(self, history, step, time, values):
+        if step % self.k == 0:
+            history.append(step, time, values)
+
+    def finish(self, history, step, time, values):
+        if step % self.k != 0:
+            history.append(step, time, values)
+
+
+class TimeGrid(object):
+    """Record the state at fixed times, the state staying as it was after the latest event up to then"""
+
+    def __init__(self, times):
+        self.times = np.asarray(times, dtype=np.float64)
+        self.index = 0
+        self.last = None
+
+    def record(self, history, step, time, values):
+        while self.index < len(self.times) and self.times[self.index] < time and self.last is not None:
+            history.append(self.last[0], self.times[self.index], self.last[1])
+            self.index += 1
+        while self.index < len(self.times) and self.times[self.index] <= time:
+            history.append(step, self.times[self.index], values)
+            self.index += 1
+        self.last = step, values
+
+    def finish(self, history, step, time, values):
+        while self.index < len(self.times):
+            history.append(step, self.times[self.index], values)
+            self.index += 1
+
+
+class FinalOnly(object):
+    """Record only the final state"""
+
+    def record(self, history, step, time, values):
+        pass
+
+    def finish(self, history, step, time, values):
+        history.append(step, time, values)
+
+
+class History(object):
+    """Compartment counts of a simulation over time, kept in growable arrays"""
+
+    def __init__(self, columns, policy=None, capacity=1024):
+        """Initialize an empty record of the named columns, recorded according to policy"""
+        self.columns = dict((name, index) for index, name in enumerate(columns))
+        self.initial_policy = EveryEvent() if policy is None else policy
+        self.policy = copy(self.initial_policy)
+        self.length = 0
+        self._step = np.empty(capacity, dtype=np.int64)
+        self._time = np.empty(capacity, dtype=np.float64)
+        self._values = np.empty((capacity, len(self.columns)), dtype=np.int64)
+        self.last = None
+        self.finished = False
+
+    def clear(self):
+        """Forget all the recorded rows"""
+        self.policy = copy(self.initial_policy)
+        self.length = 0
+        self.last = None
+        self.finished = False
+
+    def record(self, step, time, *values):
+        """Hand the state after an event to the recording policy"""
+        self.last = step, time, values
+        self.finished = False
+        self.policy.record(self, step, time, values)
+
+    def finish(self):
+        """Let the recording policy record the final state, once until the next state is recorded"""
+        if self.last is not None and not self.finished:
+            self.policy.finish(self, *self.last)
+            self.finished = True
+
+    def append(self, step, time, values):
+        """Store one row, doubling the arrays when they are full"""
+        if self.length == len(self._time):
+            capacity = 2 * len(self._time)
+            self._step = np.resize(self._step, capacity)
+            self._time = np.resize(self._time, capacity)
+            self._values = np.resize(self._values, (capacity, self._values.shape[1]))
+        self._step[self.length] = step
+        self._time[self.length] = time
+        self._values[self.length] = values
+        self.length += 1
+
+    @property
+    def step(self):
+        """Return the event counts of the recorded rows"""
+        return self._step[:self.length]
+
+    @property
+    def time(self):
+        """Return the times of the recorded rows"""
+        return self._time[:self.length]
+
+    def __getitem__(self, name):
+        """Return the recorded values of a column"""
+        return self._values[:self.length, self.columns[name]]
+
+    def __len__(self):
+        return self.length
+
+
+class SirHistoryMixin(object):
+    """History attributes of a sir model recording susceptible, infected and recovered counts in self.recorder"""
+
+    @property
+    def time_history(self):
+        return self.recorder.time
+
+    @property
+    def susceptible_history(self):
+        return self.recorder["susceptible"]
+
+    @property
+    def infected_history(self):
+        return self.recorder["infected"]
+
+    @property
+    def recovered_history(self):
+        return self.recorder["recovered"]
+
+
+class CompetitiveHistoryMixin(object):
+    """History attributes of a competitive sir model recording the counts of its epidemics in self.recorder"""
+
+    epidemics = 2
+
+    @property
+    def time_history(self):
+        return self.recorder.time
+
+    @property
+    def susceptible_history(self):
+        return self.recorder["susceptible"]
+
+    @property
+    def infected_history(self):
+        return tuple(self.recorder["infected%d" % i] for i in range(self.epidemics))
+
+    @property
+    def recovered_history(self):
+        return tuple(self.recorder["recovered%d" % i] for i in range(self.epidemics))
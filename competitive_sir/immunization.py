@@ -0,0 +1,97 @@
+import igraph as ig
+import numpy as np
+
+
+def _first_occurrences(items):
+    """Return the distinct items of an array in the order they first appear"""
+    order = np.argsort(items, kind="stable")
+    distinct = np.ones(len(items), dtype=bool)
+    distinct[1:] = items[order[1:]] != items[order[:-1]]
+    return items[np.sort(order[distinct])]
+
+
+class ImmunizationStrategy(object):
+    """Order in which nodes are immunized; the first count nodes of the order, bar the seeds, are removed"""
+
+    def order(self, graph, rng, size):
+        """Return the first size nodes of the immunization order, or all of them if there are fewer"""
+        raise NotImplementedError
+
+    def select(self, graph, count, rng, spared=()):
+        """Return count distinct nodes to immunize, skipping the spared ones such as the seeds"""
+        spared = np.asarray(spared, dtype=np.int64)
+        order = self.order(graph, rng, count + len(spared))
+        return order[~np.isin(order, spared)][:count]
+
+
+class RandomImmunization(ImmunizationStrategy):
+    """Immunize nodes drawn uniformly at random without replacement, so that the immune fraction is exact"""
+
+    def order(self, graph, rng, size):
+        return rng.choice(graph.vcount(), size=min(size, graph.vcount()), replace=False)
+
+
+class AcquaintanceImmunization(ImmunizationStrategy):
+    """Immunize a random neighbor of a random node, which favors high degree nodes without knowing the degrees
+
+    Neighbors are drawn in at most rounds batches, after which the nodes never chosen, isolated ones included,
+    follow in random order rather than waiting for the last leaves next to hubs to be drawn.
+    """
+
+    def __init__(self, rounds=4):
+        self.rounds = rounds
+
+    def order(self, graph, rng, size):
+        size = min(size, graph.vcount())
+        seen = np.zeros(graph.vcount(), dtype=bool)
+        chosen = []
+        count = 0
+        for _ in range(self.rounds):
+            if count >= size:
+                break
+            nodes = rng.integers(graph.vcount(), size=max(2 * (size - count), 1024))
+            degree = graph.degree(nodes)
+            nodes, degree = nodes[degree > 0], degree[degree > 0]
+            offsets = np.minimum((rng.random(len(nodes)) * degree).astype(np.int64), degree - 1)
+            picked = _first_occurrences(graph.indices[graph.indptr[nodes] + offsets].astype(np.int64))
+            picked = picked[~seen[picked]]
+            seen[picked] = True
+            chosen.append(picked)
+            count += len(picked)
+        if count < size:
+            chosen.append(rng.permutation(np.flatnonzero(~seen)))
+        return np.concatenate(chosen)[:size]
+
+
+class RankedImmunization(ImmunizationStrategy):
+    """Immunize nodes from the highest score down, ranking each graph once and caching it on the snapshot
+
+    as_adjacency keeps one snapshot per igraph graph, so engines built on the same graph share the ranking.
+    """
+
+    def scores(self, graph):
+        """Return the score of every node"""
+        raise NotImplementedError
+
+    def ranking(self, graph):
+        """Return all nodes from the highest score down, ties broken by node id"""
+        return graph.cached(type(self).__name__, lambda graph: np.argsort(-self.scores(graph), kind="stable"))
+
+    def order(self, graph, rng, size):
+        return self.ranking(graph)[:size]
+
+
+class DegreeImmunization(RankedImmunization):
+    """Immunize the nodes of highest degree first"""
+
+    def scores(self, graph):
+        return graph.degree()
+
+
+class BetweennessImmunization(RankedImmunization):
+    """Immunize the nodes of highest betweenness centrality first"""
+
+    def scores(self, graph):
+        source = np.repeat(np.arange(graph.vcount(), dtype=np.int64), graph.degree())
+        edges = np.column_stack((source, graph.indices))[source < graph.indices]
+        return np.array(ig.Graph(n=graph.vcount(), edges=edges.tolist()).betweenness(directed=False))
@@ -0,0 +1,56 @@
+import random
+
+
+class IndexedSet(object):
+    """Set with O(1) insertion, removal and uniform sampling, kept as an array plus a position map"""
+
+    def __init__(self, items=()):
+        self.items = []
+        self.position = {}
+        for item in items:
+            self.add(item)
+
+    def add(self, item):
+        """Insert an item if it is not in the set yet"""
+        if item not in self.position:
+            self.position[item] = len(self.items)
+            self.items.append(item)
+
+    def update(self, items):
+        """Insert all the items"""
+        for item in items:
+            self.add(item)
+
+    def discard(self, item):
+        """Remove an item if it is in the set, moving the last item into its slot"""
+        index = self.position.pop(item, None)
+        if index is None:
+            return
+        last = self.items.pop()
+        if index < len(self.items):
+            self.items[index] = last
+            self.position[last] = index
+
+    def remove(self, item):
+        """Remove an item, raising KeyError if it is not in the set"""
+        if item not in self.position:
+            raise KeyError(item)
+        self.discard(item)
+
+    def difference_update(self, items):
+        """Remove all the items"""
+        for item in items:
+            self.discard(item)
+
+    def sample(self, rng=random):
+        """Return an item chosen uniformly at random"""
+        return self.items[int(rng.random() * len(self.items))]
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
@@ -0,0 +1,182 @@
+import numpy as np
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+from competitive_sir.states import SUSCEPTIBLE, INFECTED, RECOVERED
+
+AVAILABLE = numba is not None
+INFECT, RECOVER = 0, 1
+
+
+def jit(function):
+    """Compile a kernel with numba when it is installed, and keep the python function otherwise"""
+    if numba is None:
+        return function
+    return numba.njit(cache=True, nogil=True)(function)
+
+
+def use_compiled(compiled=None):
+    """Return whether to run the compiled kernels, by default whenever numba is installed"""
+    if compiled is None:
+        return AVAILABLE
+    if compiled and not AVAILABLE:
+        raise ImportError("numba is needed to run the compiled kernels")
+    return compiled
+
+
+def rng_state(rng):
+    """Seed the explicit state of the kernels' random generator from a numpy Generator"""
+    return rng.integers(np.iinfo(np.uint64).max, size=1, dtype=np.uint64, endpoint=True)
+
+
+@jit
+def uniform(state):
+    """Return a uniform number in [0, 1) from a splitmix64 generator, advancing its one-element state"""
+    state[0] += np.uint64(0x9E3779B97F4A7C15)
+    z = state[0]
+    z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)) * (1. / 9007199254740992.)
+
+
+@jit
+def infect_frontier(indptr, indices, state, active, escape, exposure, rng):
+    """Return the susceptible neighbors of the active nodes infected in one Reed Frost generation
+
+    A neighbor of k active nodes is infected with probability 1 - escape ** k. exposure is an all-zero int32
+    scratch array over the nodes, left as it was found.
+    """
+    total = 0
+    for source in active:
+        total += indptr[source + 1] - indptr[source]
+    candidates = np.empty(total, dtype=np.int64)
+    found = 0
+    for source in active:
+        for entry in range(indptr[source], indptr[source + 1]):
+            vertex = indices[entry]
+            if state[vertex] == SUSCEPTIBLE:
+                if exposure[vertex] == 0:
+                    candidates[found] = vertex
+                    found += 1
+                exposure[vertex] += 1
+    infected = 0
+    for k in range(found):
+        vertex = candidates[k]
+        if uniform(rng) > escape ** exposure[vertex]:
+            candidates[infected] = vertex
+            infected += 1
+        exposure[vertex] = 0
+    return candidates[:infected].copy()
+
+
+def infect_frontier_numpy(graph, state, active, escape, rng):
+    """Return the susceptible neighbors of the active nodes infected in one Reed Frost generation, with numpy"""
+    targets = graph.gather(active)
+    targets = np.sort(targets[state[targets] == SUSCEPTIBLE])
+    first = np.ones(len(targets), dtype=bool)
+    first[1:] = targets[1:] != targets[:-1]
+    starts = np.flatnonzero(first)
+    exposure = np.diff(np.append(starts, len(targets)))
+    rand = rng.random(len(starts))
+    return targets[starts][rand > escape ** exposure]
+
+
+@jit
+def _add(items, position, size, item):
+    """Append an item to an indexed array set of the given size"""
+    position[item] = size
+    items[size] = item
+    return size + 1
+
+
+@jit
+def _remove(items, position, size, item):
+    """Remove an item from an indexed array set of the given size, moving the last item into its place"""
+    index = position[item]
+    last = items[size - 1]
+    items[index] = last
+    position[last] = index
+    position[item] = -1
+    return size - 1
+
+
+@jit
+def gillespie_events(indptr, indices, reverse, state, infected, infected_position, links, link_position, sizes,
+                     clock, infection_rate, recover_rate, rng, times, kinds, nodes, sources):
+    """Draw up to len(times) events of the Gillespie sir model and return how many were drawn
+
+    Infected nodes and infectious links, given as entries of indices, are indexed array sets of sizes[0] and
+    sizes[1] items. Each event is written to times, kinds, nodes and sources, the latter being -1 for recoveries.
+    """
+    infected_count, link_count = sizes[0], sizes[1]
+    drawn = 0
+    while drawn < len(times) and infected_count > 0:
+        rate1, rate2 = link_count * infection_rate, infected_count * recover_rate
+        if uniform(rng) * (rate1 + rate2) < rate1:
+            entry = links[min(int(uniform(rng) * link_count), link_count - 1)]
+            node = indices[entry]
+            sources[drawn] = np.searchsorted(indptr, entry, side="right") - 1
+            kinds[drawn] = INFECT
+            state[node] = INFECTED[0]
+            infected_count = _add(infected, infected_position, infected_count, node)
+            for neighbor in range(indptr[node], indptr[node + 1]):
+                if state[indices[neighbor]] == SUSCEPTIBLE:
+                    link_count = _add(links, link_position, link_count, neighbor)
+                elif link_position[reverse[neighbor]] >= 0:
+                    link_count = _remove(links, link_position, link_count, reverse[neighbor])
+        else:
+            node = infected[min(int(uniform(rng) * infected_count), infected_count - 1)]
+            sources[drawn] = -1
+            kinds[drawn] = RECOVER
+            state[node] = RECOVERED[0]
+            infected_count = _remove(infected, infected_position, infected_count, node)
+            for neighbor in range(indptr[node], indptr[node + 1]):
+                if link_position[neighbor] >= 0:
+                    link_count = _remove(links, link_position, link_count, neighbor)
+        clock[0] -= np.log(1. - uniform(rng)) / (rate1 + rate2)
+        times[drawn] = clock[0]
+        nodes[drawn] = node
+        drawn += 1
+    sizes[0], sizes[1] = infected_count, link_count
+    return drawn
+
+
+class GillespieKernel(object):
+    """State of the Gillespie sir model in arrays over the nodes and the adjacency entries, for the compiled kernel"""
+
+    def __init__(self, graph, infected, infection_rate, recover_rate, rng, batch=4096):
+        """Start from one infected node of an adjacency snapshot, seeding the kernel's generator from rng"""
+        self.graph = graph
+        self.infection_rate = infection_rate
+        self.recover_rate = recover_rate
+        self.reverse = graph.reverse_index()
+        self.state = np.full(graph.vcount(), SUSCEPTIBLE, dtype=np.uint8)
+        self.infected = np.empty(graph.vcount(), dtype=np.int64)
+        self.infected_position = np.full(graph.vcount(), -1, dtype=np.int64)
+        self.links = np.empty(len(graph.indices), dtype=np.int64)
+        self.link_position = np.full(len(graph.indices), -1, dtype=np.int64)
+        self.sizes = np.zeros(2, dtype=np.int64)
+        self.clock = np.zeros(1, dtype=np.float64)
+        self.rng = rng_state(rng)
+        self.times = np.empty(batch, dtype=np.float64)
+        self.kinds = np.empty(batch, dtype=np.uint8)
+        self.nodes = np.empty(batch, dtype=np.int64)
+        self.sources = np.empty(batch, dtype=np.int64)
+
+        self.state[infected] = INFECTED[0]
+        self.sizes[0] = _add(self.infected, self.infected_position, 0, infected)
+        for entry in range(graph.indptr[infected], graph.indptr[infected + 1]):
+            self.sizes[1] = _add(self.links, self.link_position, self.sizes[1], entry)
+
+    def run(self):
+        """Draw the next batch of events and return their times, kinds, nodes and sources as lists"""
+        drawn = gillespie_events(self.graph.indptr, self.graph.indices, self.reverse, self.state, self.infected,
+                                 self.infected_position, self.links, self.link_position, self.sizes, self.clock,
+                                 self.infection_rate, self.recover_rate, self.rng, self.times, self.kinds, self.nodes,
+                                 self.sources)
+        return (self.times[:drawn].tolist(), self.kinds[:drawn].tolist(), self.nodes[:drawn].tolist(),
+                self.sources[:drawn].tolist())
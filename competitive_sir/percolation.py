@@ -0,0 +1,185 @@
+from __future__ import division
+
+import igraph as ig
+import numpy as np
+
+from competitive_sir.adjacency import as_adjacency
+
+
+class UnionFind(object):
+    """Disjoint sets of nodes, keeping the members of every set"""
+
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.members = list([vertex] for vertex in range(size))
+
+    def find(self, vertex):
+        """Return the root of the set of a vertex"""
+        parent = self.parent
+        while parent[vertex] != vertex:
+            parent[vertex] = parent[parent[vertex]]
+            vertex = parent[vertex]
+        return vertex
+
+    def union(self, vertex1, vertex2):
+        """Merge the sets of two vertices, the smaller one into the larger one"""
+        root1, root2 = self.find(vertex1), self.find(vertex2)
+        if root1 == root2:
+            return
+        if len(self.members[root1]) < len(self.members[root2]):
+            root1, root2 = root2, root1
+        self.parent[root2] = root1
+        self.members[root1].extend(self.members[root2])
+        self.members[root2] = None
+
+    def component(self, vertex):
+        """Return the members of the set of a vertex"""
+        return self.members[self.find(vertex)]
+
+
+class PercolationReedFrost(object):
+    """Outbreak sizes of the immunized competitive Reed Frost model, read off one percolation sample
+
+    Every edge is tested at most once, by one epidemic, so the process is fixed by which edges are open to each
+    epidemic, the seeds and the immunization order. Immunization follows ImmunizationReedFrost: int(rate * n)
+    nodes are drawn with replacement and the seeds are spared, or the first int(rate * n) nodes of a strategy's
+    order are removed.
+    """
+
+    def __init__(self, graph: ig.Graph, time_step=(1., 2.01), transmission_rate=(0.1, 0.2), seed=None,
+                 strategy=None, seeds=1):
+        """Sample the open edges of both epidemics, seeds distinct nodes per epidemic and the immunization order"""
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
+        self.time_step = time_step
+        self.transmission_rate = transmission_rate
+        size = self.graph.vcount()
+        edge_index = self.graph.edge_index()
+        self.open = list((self.rng.random(self.graph.ecount()) < rate)[edge_index] for rate in transmission_rate)
+        self.seeds = self.rng.choice(size, size=2 * seeds, replace=False).tolist()
+        self.sources = [self.seeds[:seeds], self.seeds[seeds:]]
+        self._open_neighbors = [None, None]
+
+        if strategy is None:
+            draws = self.rng.integers(size, size=size)
+            _, first = np.unique(draws, return_index=True)
+            self.appearance = np.sort(first)
+            never_drawn = np.setdiff1d(np.arange(size), draws)
+            self.order = np.concatenate((draws[self.appearance], self.rng.permutation(never_drawn)))
+        else:
+            immunized = strategy.select(self.graph, size, self.rng, self.seeds)
+            spared = np.ones(size, dtype=bool)
+            spared[immunized] = False
+            spared[self.seeds] = False
+            self.appearance = np.arange(len(immunized))
+            self.order = np.concatenate((immunized, np.flatnonzero(spared)))
+
+    def removed_count(self, immunity_rate):
+        """Return how many nodes at the start of the immunization order are removed at an immunity rate"""
+        return int(np.searchsorted(self.appearance, int(immunity_rate * self.graph.vcount())))
+
+    def outbreak(self, immunity_rate):
+        """Return the outbreak sizes of both epidemics at an immunity rate"""
+        active = np.ones(self.graph.vcount(), dtype=bool)
+        active[self.order[:self.removed_count(immunity_rate)]] = False
+        active[self.seeds] = True
+        return self.first_passage(active)
+
+    def open_neighbors(self, i):
+        """Return, for every vertex, the list of its neighbors through edges open to epidemic i"""
+        if self._open_neighbors[i] is None:
+            source = np.repeat(np.arange(self.graph.vcount()), self.graph.degree())
+            bounds = np.zeros(self.graph.vcount() + 1, dtype=np.int64)
+            np.cumsum(np.bincount(source[self.open[i]], minlength=self.graph.vcount()), out=bounds[1:])
+            targets = self.graph.indices[self.open[i]].tolist()
+            bounds = bounds.tolist()
+            self._open_neighbors[i] = list(targets[bounds[vertex]:bounds[vertex + 1]]
+                                           for vertex in range(self.graph.vcount()))
+        return self._open_neighbors[i]
+
+    def first_passage(self, active, owner=None):
+        """Spread both epidemics through their open edges among active nodes, in the order of the Reed Frost ticks
+
+        Epidemic i claims the nodes reached by its latest generation at every multiple of its time step, epidemic 0
+        first at equal times. If owner is given, a list over the nodes, the epidemic taking each node is written to it.
+        """
+        open_neighbors = self.open_neighbors(0), self.open_neighbors(1)
+        available = active.tolist()
+        sizes = [0, 0]
+        pending = [list(self.sources[0]), list(self.sources[1])]
+        time = [0., 0.]
+        while pending[0] or pending[1]:
+            i = 0 if pending[0] and (not pending[1] or time[0] <= time[1]) else 1
+            claimed = []
+            for vertex in pending[i]:
+                if available[vertex]:
+                    available[vertex] = False
+                    claimed.append(vertex)
+            sizes[i] += len(claimed)
+            if owner is not None:
+                for vertex in claimed:
+                    owner[vertex] = i
+            neighbors = open_neighbors[i]
+            pending[i] = list(target for vertex in claimed for target in neighbors[vertex] if available[target])
+            time[i] += self.time_step[i]
+        return sizes
+
+    def curve(self, immunity_rate):
+        """Return the outbreak sizes of both epidemics at every immunity rate, adding nodes back Newman-Ziff style
+
+        The seeds of each epidemic are merged into one set of its union find. While the open components of the two
+        epidemics are disjoint, each epidemic takes its whole component. Once they touch, the remaining levels fall
+        back to first_passage on the same sample, which is skipped when none of the nodes added back has an open edge
+        to a node taken by the same epidemic at the previous level.
+        """
+        open_neighbors = self.open_neighbors(0), self.open_neighbors(1)
+        size = self.graph.vcount()
+        sets = UnionFind(size), UnionFind(size)
+        active = np.zeros(size, dtype=bool)
+        active[self.seeds] = True
+        for i in (0, 1):
+            for vertex in self.sources[i][1:]:
+                sets[i].union(self.sources[i][0], vertex)
+        result = np.zeros((len(immunity_rate), 2), dtype=np.int64)
+        added, contact, owner, previous = size, False, None, None
+        for level in np.argsort(immunity_rate, kind="stable")[::-1]:
+            count = self.removed_count(immunity_rate[level])
+            new = self.order[count:added].tolist()
+            for vertex in new:
+                active[vertex] = True
+            for vertex in new + (self.seeds if added == size else []):
+                for i in (0, 1):
+                    for target in open_neighbors[i][vertex]:
+                        if active[target]:
+                            sets[i].union(vertex, target)
+            added = count
+            if not contact:
+                component1, component2 = sets[0].component(self.sources[0][0]), sets[1].component(self.sources[1][0])
+                if len(component1) <= len(component2):
+                    root = sets[1].find(self.sources[1][0])
+                    contact = any(sets[1].find(vertex) == root for vertex in component1)
+                else:
+                    root = sets[0].find(self.sources[0][0])
+                    contact = any(sets[0].find(vertex) == root for vertex in component2)
+            if contact and owner is not None and not any(owner[target] == i for vertex in new for i in (0, 1)
+                                                          for target in open_neighbors[i][vertex]):
+                result[level] = previous
+            elif contact:
+                owner = [-1] * size
+                previous = result[level] = self.first_passage(active, owner)
+            else:
+                result[level] = len(component1), len(component2)
+        return result
+
+
+def percolation_curve(graph: ig.Graph, immunity_rate=np.linspace(0, 1., 100), time_step=(1., 2.01),
+                      transmission_rate=(0.1, 0.2), replicas=50, seed=None, strategy=None, seeds=1):
+    """Return the outbreak sizes at every immunity rate, shaped (rates, 2, replicas) like immunization_sweep"""
+    graph = as_adjacency(graph)
+    rng = np.random.default_rng(seed)
+    immunity_rate = np.asarray(immunity_rate)
+    result = np.zeros((len(immunity_rate), 2, replicas), dtype=np.int64)
+    for replica in range(replicas):
+        epidemic = PercolationReedFrost(graph, time_step, transmission_rate, rng, strategy, seeds)
+        result[:, :, replica] = epidemic.curve(immunity_rate)
+    return result
@@ -0,0 +1,59 @@
+import logging
+import time
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+
+class Profiler(object):
+    """Per-phase timers and per-step counters of a simulation, with a callback invoked after every step
+
+    Engines take a profiler=None argument and only touch it behind an `is not None` check, so a disabled profiler
+    costs one comparison per phase.
+    """
+
+    clock = staticmethod(time.perf_counter)
+
+    def __init__(self, callback=None, keep_steps=True):
+        """Initialize empty timers and counters, keeping the counters of every step when keep_steps is set"""
+        self.callback = callback
+        self.keep_steps = keep_steps
+        self.timers = defaultdict(float)
+        self.totals = defaultdict(int)
+        self.counters = defaultdict(int)
+        self.count = 0
+        self.steps = []
+
+    def add_time(self, phase, start):
+        """Add the time elapsed since start, taken from clock, to a phase, and return the current clock"""
+        now = self.clock()
+        self.timers[phase] += now - start
+        return now
+
+    def add(self, counter, amount=1):
+        """Add to a counter of the current step"""
+        self.counters[counter] += amount
+
+    def step(self, model):
+        """Close the current step, handing its counters to the callback"""
+        counters = dict(self.counters)
+        for counter, amount in counters.items():
+            self.totals[counter] += amount
+        if self.keep_steps:
+            self.steps.append(counters)
+        self.counters.clear()
+        self.count += 1
+        if self.callback is not None:
+            self.callback(model, counters)
+
+    def summary(self):
+        """Return the total time of every phase and the total of every counter"""
+        return {"timers": dict(self.timers), "counters": dict(self.totals), "steps": self.count}
+
+    def report(self, level=logging.INFO):
+        """Log the time of every phase, slowest first, and the counter totals"""
+        total = sum(self.timers.values())
+        for phase, elapsed in sorted(self.timers.items(), key=lambda item: -item[1]):
+            logger.log(level, "%-12s %10.4fs %6.1f%%", phase, elapsed, 100 * elapsed / total if total else 0.)
+        for counter, amount in sorted(self.totals.items()):
+            logger.log(level, "%-12s %10d", counter, amount)
@@ -1,22 +1,100 @@
+import warnings
+
 import igraph as ig
 import numpy as np
 
+
+class DegreeDistribution(object):
+    """Degree distribution of a network, kept as a histogram of its distinct degrees"""
+
+    def __init__(self, degree_ls):
+        """Build the histogram of a list of node degrees"""
+        count = np.bincount(np.asarray(degree_ls, dtype=np.int64))
+        self.degree = np.flatnonzero(count)
+        count = count[self.degree]
+        self.probability = count / count.sum()
+        self.mean = float(np.dot(self.probability, self.degree))
+        self.squared_mean = float(np.dot(self.probability, self.degree ** 2))
+
+    @classmethod
+    def from_graph(cls, graph: ig.Graph):
+        """Build the distribution of a graph or of an adjacency snapshot"""
+        return cls(graph.degree())
+
+    def _evaluate(self, x, coefficient, power):
+        """Return sum over degrees of p_k * coefficient_k * x ** power_k for every entry of x"""
+        x = np.asarray(x, dtype=np.float64)
+        used = coefficient != 0
+        terms = np.power.outer(x, power[used].astype(np.float64))
+        return terms @ (self.probability[used] * coefficient[used])
+
+    def g0(self, x):
+        """Return the generating function of the degree"""
+        return self._evaluate(x, np.ones(len(self.degree)), self.degree)
+
+    def g0_deriv(self, x):
+        """Return the derivative of the generating function of the degree"""
+        return self._evaluate(x, self.degree, self.degree - 1)
+
+    def g1(self, x):
+        """Return the generating function of the excess degree"""
+        return self._evaluate(x, self.degree / self.mean, self.degree - 1)
+
+    def g1_deriv(self, x):
+        """Return the derivative of the generating function of the excess degree"""
+        return self._evaluate(x, self.degree * (self.degree - 1) / self.mean, self.degree - 2)
+
+    def threshold(self):
+        """Return the transmissibility above which an epidemic can spread"""
+        return self.mean / (self.squared_mean - self.mean)
+
+    def fixed_point(self, transmissibility, occupation=1., tolerance=1e-12, max_iterations=200):
+        """Return the probability u that an edge does not lead to the giant outbreak, for arrays of parameters
+
+        Solves u = 1 - phi * T + phi * T * G1(u) where a fraction phi of the nodes is not immunized. At or below the
+        threshold, phi * T <= threshold(), the only root in [0, 1] is u = 1. Above it, the right hand side minus u is
+        convex, positive at u = 0 and decreasing up to the smallest root, so Newton steps from u = 0 climb to that
+        root without overshooting. Entries leave the iteration once their step falls below tolerance.
+        """
+        rate = np.asarray(transmissibility, dtype=np.float64) * np.asarray(occupation, dtype=np.float64)
+        u = np.ones(rate.size)
+        active = np.flatnonzero(rate.ravel() * (self.squared_mean - self.mean) > self.mean)
+        current = rate.ravel()[active]
+        x = np.zeros(len(active))
+        for _ in range(max_iterations):
+            if not len(active):
+                break
+            step = (1 - current + current * self.g1(x) - x) / (current * self.g1_deriv(x) - 1)
+            x = np.minimum(x - step, 1.)
+            converged = np.abs(step) < tolerance
+            u[active[converged]] = x[converged]
+            active, current, x = active[~converged], current[~converged], x[~converged]
+        if len(active):
+            u[active] = x
+            warnings.warn("fixed_point did not converge for {} of {} entries in {} iterations".format(
+                len(active), rate.size, max_iterations), RuntimeWarning)
+        return u.reshape(rate.shape)
+
+    def outbreak_size(self, transmissibility, occupation=1.):
+        """Return the expected fraction of all nodes taken by a large outbreak"""
+        u = self.fixed_point(transmissibility, occupation)
+        return np.asarray(occupation) * (1 - self.g0(u.ravel()).reshape(u.shape))
+
+    def immunization_threshold(self, transmissibility):
+        """Return the fraction of randomly immunized nodes above which an epidemic cannot spread"""
+        return np.clip(1 - self.threshold() / np.asarray(transmissibility, dtype=np.float64), 0., 1.)
+
+
 def excess_degree(network: ig.Graph):
     """Return the generating function of excess degree"""
-    degree_ls = list(network.degree(vertex) for vertex in network.vs.indices)
-    mean = np.mean(degree_ls)
-    return lambda x: sum(k * x ** (k - 1) for k in degree_ls) / mean / len(degree_ls)
+    return DegreeDistribution.from_graph(network).g1
 
 
 def excess_degree_deriv(network: ig.Graph):
     """Return the derivative of the generarting function of excess degree"""
-    degree_ls = list(network.degree(vertex) for vertex in network.vs.indices)
-    mean = np.mean(degree_ls)
-    return lambda x: sum(k * (k - 1) * x ** (k - 2) for k in degree_ls) / mean / len(degree_ls)
+    return DegreeDistribution.from_graph(network).g1_deriv
 
 
 def get_threhsold(graph: ig.Graph):
     """Return the threshold for the epidemic to spread"""
-    expected_degree = sum(graph.degree(vertex) for vertex in graph.vs)
-    squared_degree = sum(graph.degree(vertex) ** 2 for vertex in graph.vs)
-    return expected_degree / (squared_degree - expected_degree)
+    return DegreeDistribution.from_graph(graph).threshold()
@@ -1,90 +1,171 @@
 from __future__ import division
 
-import random
+import logging
+from collections import deque
 
 import igraph as ig
 import matplotlib.pyplot as plt
 import numpy as np
-from scipy.integrate import odeint
+from scipy.integrate import RK45, odeint, solve_ivp
 
+from competitive_sir import kernels
+from competitive_sir.adjacency import as_adjacency
+from competitive_sir.history import History, SirHistoryMixin
+from competitive_sir.indexed_set import IndexedSet
+from competitive_sir.states import SUSCEPTIBLE, INFECTED, RECOVERED
+from competitive_sir.streaming import Snapshot
 
-class SirNaive(object):
-    """Naive implementation SIR model"""
+logger = logging.getLogger(__name__)
+
+
+def sir_deriv(t, y, n, beta, gamma):
+    """Return the derivatives of the mean field sir model"""
+    s, i, r = y
+    infection = beta * s * i / n
+    return np.array((-infection, infection - gamma * i, gamma * i))
+
+
+class SirNaive(SirHistoryMixin):
+    """Naive implementation SIR model, simulated event by event with the Gillespie algorithm
+
+    With compiled kernels, the events are drawn in batches by kernels.GillespieKernel and replayed on the node sets
+    one at a time, so that steps, recording and stopping behave as with the python events.
+    """
 
     def __init__(self, graph: ig.Graph, infection_rate=0.002, recover_rate=0.01,
-                 verbose=True):
-        """"Initialize a sir model with designated infection and recove rate"""
-        self.graph = graph
+                 verbose=True, recording=None, seed=None, profiler=None, compiled=None):
+        """"Initialize a sir model with designated infection and recove rate, drawing from a seed or Generator"""
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
         self.infection_rate = infection_rate
         self.recover_rate = recover_rate
         self.verbose = verbose
+        self.profiler = profiler
 
-        self.infected = set(random.sample(list(self.graph.vs.indices), k=1))
+        self.infected = IndexedSet([int(self.rng.integers(self.graph.vcount()))])
         self.recovered = set()
-        self.susceptible = set(self.graph.vs.indices).difference(self.infected)
-
-        self.links = set()
-        self.links.update((i, s) for i in self.infected for s in self.graph.neighbors(i) if s in self.susceptible)
-
-        self.time_history = [0.]
-        self.susceptible_history = [len(self.susceptible)]
-        self.infected_history = [len(self.infected)]
-        self.recovered_history = [len(self.recovered)]
+        self.susceptible = set(range(self.graph.vcount())).difference(self.infected)
+
+        self.links = IndexedSet()
+        self.kernel = None
+        if kernels.use_compiled(compiled):
+            self.kernel = kernels.GillespieKernel(self.graph, next(iter(self.infected)), infection_rate, recover_rate,
+                                                  self.rng)
+            self.pending = deque()
+        else:
+            self.links.update((i, s) for i in self.infected for s in self.graph.neighbors(i).tolist()
+                              if s in self.susceptible)
 
         self.time = 0.
         self.count = 0
+        self.recorder = History(("susceptible", "infected", "recovered"), recording)
+        self.recorder.record(self.count, self.time, self.get_susceptible(), self.get_infected(),
+                             self.get_recovered())
 
         if self.verbose:
-            print("Proportion of three types: {:.3f} {:.3f} {:.3f}".format(self.get_susceptible() / self.get_all(),
-                                                                           self.get_infected() / self.get_all(),
-                                                                           self.get_recovered() / self.get_all()))
-
-    def run(self):
-        """Run the simulation of the sir model"""
-        while len(self.infected) > 0:
-            rate1, rate2 = len(self.links) * self.infection_rate, len(self.infected) * self.recover_rate
-            rate = [float(rate1) / (rate1 + rate2), float(rate2) / (rate1 + rate2)]
-            if np.random.choice([0, 1], p=rate) == 0:
-                self.infect_event()
-            else:
-                self.recover_event()
-            self.susceptible_history.append(self.get_susceptible())
-            self.infected_history.append(self.get_infected())
-            self.recovered_history.append(self.get_recovered())
-            self.count += 1
-            self.time += random.expovariate(1 / (rate1 + rate2))
-            self.time_history.append(self.time)
-
-            if self.verbose:
-                print("Proportion of three types: {:.3f} {:.3f} {:.3f}".format(self.get_susceptible() / self.get_all(),
-                                                                               self.get_infected() / self.get_all(),
-                                                                               self.get_recovered() / self.get_all()))
+            self.log_proportion()
+
+    def run(self, stop=None):
+        """Run the simulation of the sir model, until no node is infected or stop(model, snapshot) holds"""
+        for _ in self.steps(stop):
+            pass
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every event, until no node is infected or stop(model, snapshot) holds"""
+        profiler = self.profiler
+        try:
+            while len(self.infected) > 0:
+                if profiler is not None:
+                    start = profiler.clock()
+                if self.kernel is not None:
+                    self.kernel_event()
+                    if profiler is not None:
+                        start = profiler.add_time("kernel", start)
+                else:
+                    rate1, rate2 = len(self.links) * self.infection_rate, len(self.infected) * self.recover_rate
+                    if self.rng.random() * (rate1 + rate2) < rate1:
+                        self.infect_event()
+                        if profiler is not None:
+                            start = profiler.add_time("infection", start)
+                    else:
+                        self.recover_event()
+                        if profiler is not None:
+                            start = profiler.add_time("recovery", start)
+                    self.time += self.rng.exponential(1 / (rate1 + rate2))
+                self.count += 1
+                self.recorder.record(self.count, self.time, self.get_susceptible(), self.get_infected(),
+                                     self.get_recovered())
+                if profiler is not None:
+                    profiler.add_time("record", start)
+                    profiler.step(self)
+
+                if self.verbose:
+                    self.log_proportion()
+                snapshot = self.snapshot()
+                yield snapshot
+                if stop is not None and stop(self, snapshot):
+                    break
+        finally:
+            self.recorder.finish()
         if self.verbose:
-            print("Outbreak size:", self.get_all() - self.get_susceptible(), "out of", self.get_all())
+            logger.info("Outbreak size: %d out of %d", self.get_all() - self.get_susceptible(), self.get_all())
+
+    def log_proportion(self):
+        """Log the proportion of the three types of nodes"""
+        logger.info("Proportion of three types: %.3f %.3f %.3f", self.get_susceptible() / self.get_all(),
+                    self.get_infected() / self.get_all(), self.get_recovered() / self.get_all())
+
+    def kernel_event(self):
+        """Replay the next event drawn by the compiled kernel, drawing a new batch when none is pending"""
+        if not self.pending:
+            self.pending.extend(zip(*self.kernel.run()))
+        self.time, kind, node, source = self.pending.popleft()
+        if kind == kernels.INFECT:
+            self.susceptible.remove(node)
+            self.infected.add(node)
+            if self.verbose:
+                logger.debug("Node %d is infected by node %d", node, source)
+        else:
+            self.infected.remove(node)
+            self.recovered.add(node)
+            if self.verbose:
+                logger.debug("Node %d has recovered.", node)
+        if self.profiler is not None:
+            self.profiler.add("infections" if kind == kernels.INFECT else "recoveries")
 
     def recover_event(self):
         """A node is recovered"""
-        node = random.sample(self.infected, 1)[0]
+        node = self.infected.sample(self.rng)
         self.infected.remove(node)
         self.recovered.add(node)
-        self.links.difference_update((node, s) for s in self.graph.neighbors(node))
+        self.links.difference_update((node, s) for s in self.graph.neighbors(node).tolist())
+        if self.profiler is not None:
+            self.profiler.add("recoveries")
+            self.profiler.add("edges", int(self.graph.degree(node)))
         if self.verbose:
-            print("Node", node, "has recovered. ")
+            logger.debug("Node %d has recovered.", node)
 
     def infect_event(self):
         """A node is infected"""
-        link = random.sample(self.links, 1)[0]
+        link = self.links.sample(self.rng)
         source, node = link
         self.susceptible.remove(node)
         self.infected.add(node)
-        self.links.update((node, s) for s in self.graph.neighbors(node) if s in self.susceptible)
-        self.links.difference_update((i, node) for i in self.graph.neighbors(node))
+        self.links.update((node, s) for s in self.graph.neighbors(node).tolist() if s in self.susceptible)
+        self.links.difference_update((i, node) for i in self.graph.neighbors(node).tolist())
+        if self.profiler is not None:
+            self.profiler.add("infections")
+            self.profiler.add("edges", 2 * int(self.graph.degree(node)))
         if self.verbose:
-            print("Node", node, "is infect by node", source)
+            logger.debug("Node %d is infected by node %d", node, source)
+
+    def snapshot(self):
+        """Return the current counts as a snapshot"""
+        return Snapshot(self.count, self.time, self.get_susceptible(), self.get_infected(), self.get_recovered())
 
     def get_all(self):
         """Return the number of all nodes"""
-        return len(self.graph.vs)
+        return self.graph.vcount()
 
     def get_susceptible(self):
         """Return the number of susceptible nodes at a time"""
@@ -108,60 +189,103 @@ class SirNaive(object):
 
     def plot_count(self):
         """Plot the sir process w.r.t count"""
-        plt.plot(range(self.count + 1), self.susceptible_history, label="Susceptible")
-        plt.plot(range(self.count + 1), self.infected_history, label="Infected")
-        plt.plot(range(self.count + 1), self.recovered_history, label="Recovered")
+        plt.plot(self.recorder.step, self.susceptible_history, label="Susceptible")
+        plt.plot(self.recorder.step, self.infected_history, label="Infected")
+        plt.plot(self.recorder.step, self.recovered_history, label="Recovered")
         plt.legend()
         plt.show()
 
 
-class SirReedFrost(object):
-    """Using Reed Frost to solve sir model"""
+class SirReedFrost(SirHistoryMixin):
+    """Using Reed Frost to solve sir model
 
-    def __init__(self, graph: ig.Graph, transmission_rate=0.2, verbose=True):
-        self.graph = graph
+    Node states are kept in a uint8 array with the codes of the states module, and each generation only visits the
+    neighbors of the infected nodes, in a compiled kernel when numba is installed.
+    """
+
+    def __init__(self, graph: ig.Graph, transmission_rate=0.2, verbose=True, recording=None, seed=None,
+                 profiler=None, compiled=None):
+        self.graph = as_adjacency(graph)
+        self.rng = np.random.default_rng(seed)
         self.transmission_rate = transmission_rate
         self.verbose = verbose
-        self.infected = set(random.sample(list(self.graph.vs.indices), k=1))
-        self.recovered = set()
-        self.susceptible = set(self.graph.vs.indices).difference(self.infected)
+        self.profiler = profiler
+        self.compiled = kernels.use_compiled(compiled)
+        infected = self.rng.integers(self.graph.vcount())
+        self.state = np.full(self.graph.vcount(), SUSCEPTIBLE, dtype=np.uint8)
+        self.state[infected] = INFECTED[0]
+        self.active = np.array([infected], dtype=np.int64)
+        self.counts = [self.graph.vcount() - 1, 1, 0, 0, 0, 0]
+        if self.compiled:
+            self.exposure = np.zeros(self.graph.vcount(), dtype=np.int32)
+            self.kernel_rng = kernels.rng_state(self.rng)
         self.time = 0
-        self.susceptible_history = [self.get_susceptible()]
-        self.infected_history = [self.get_infected()]
-        self.recovered_history = [self.get_recovered()]
-
-    def run(self):
-        """Run the simulation"""
-        while len(self.infected) > 0:
-            self.time += 1
-            infected_set = set()
-            for vertex in self.susceptible:
-                self.infection_event(vertex, infected_set)
-            self.infected.update(infected_set)
-            self.susceptible.difference_update(infected_set)
-            if self.verbose:
-                print("Node", infected_set, "are infected.")
-
-            self.recovered.update(self.infected)
-            if self.verbose:
-                print("Node", self.infected, "have recovered.")
-            self.infected = infected_set
-
-            self.susceptible_history.append(self.get_susceptible())
-            self.infected_history.append(self.get_infected())
-            self.recovered_history.append(self.get_recovered())
-            if self.verbose:
-                print("Proportion of three types: {:.3f} {:.3f} {:.3f}".format(
-                    self.get_susceptible() / self.get_all(),
-                    self.get_infected() / self.get_all(),
-                    self.get_recovered() / self.get_all()))
+        self.count = 0
+        self.recorder = History(("susceptible", "infected", "recovered"), recording)
+        self.recorder.record(self.time, self.time, self.get_susceptible(), self.get_infected(), self.get_recovered())
+
+    def run(self, stop=None):
+        """Run the simulation, until no node is infected or stop(model, snapshot) holds"""
+        for _ in self.steps(stop):
+            pass
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every generation, until no node is infected or stop(model, snapshot) holds"""
+        profiler = self.profiler
+        try:
+            while self.counts[INFECTED[0]] > 0:
+                self.time += 1
+                self.count += 1
+                if profiler is not None:
+                    profiler.add("vertices", len(self.active))
+                    profiler.add("edges", int(self.graph.degree(self.active).sum()))
+                    start = profiler.clock()
+                if self.compiled:
+                    newly_infected = kernels.infect_frontier(self.graph.indptr, self.graph.indices, self.state,
+                                                             self.active, 1 - self.transmission_rate, self.exposure,
+                                                             self.kernel_rng)
+                else:
+                    newly_infected = kernels.infect_frontier_numpy(self.graph, self.state, self.active,
+                                                                   1 - self.transmission_rate, self.rng)
+                if profiler is not None:
+                    start = profiler.add_time("infection", start)
+                    profiler.add("infections", len(newly_infected))
+                    profiler.add("recoveries", len(self.active))
+                if self.verbose:
+                    logger.debug("Nodes %s are infected.", newly_infected)
+                    logger.debug("Nodes %s have recovered.", self.active)
+                self.state[self.active] = RECOVERED[0]
+                self.state[newly_infected] = INFECTED[0]
+                self.counts[SUSCEPTIBLE] -= len(newly_infected)
+                self.counts[RECOVERED[0]] += len(self.active)
+                self.counts[INFECTED[0]] = len(newly_infected)
+                self.active = newly_infected
+                if profiler is not None:
+                    start = profiler.add_time("update", start)
+
+                self.recorder.record(self.time, self.time, self.get_susceptible(), self.get_infected(),
+                                     self.get_recovered())
+                if profiler is not None:
+                    profiler.add_time("record", start)
+                    profiler.step(self)
+                if self.verbose:
+                    logger.info("Proportion of three types: %.3f %.3f %.3f", self.get_susceptible() / self.get_all(),
+                                self.get_infected() / self.get_all(), self.get_recovered() / self.get_all())
+                snapshot = self.snapshot()
+                yield snapshot
+                if stop is not None and stop(self, snapshot):
+                    break
+        finally:
+            self.recorder.finish()
         if self.verbose:
-            print("Outbreak size:", self.get_all() - self.get_susceptible(), "out of", self.get_all())
+            logger.info("Outbreak size: %d out of %d", self.get_all() - self.get_susceptible(), self.get_all())
 
-    def infection_event(self, vertex, infected_ls):
+    def infection_event(self, vertex, infected_ls, rand=None):
         """If vertex is infected, push it into the list"""
-        infected_neighbors = len(self.infected.intersection(self.graph.neighbors(vertex)))
-        if random.random() > (1 - self.transmission_rate) ** infected_neighbors:
+        infected_neighbors = np.count_nonzero(self.state[self.graph.neighbors(vertex)] == INFECTED[0])
+        if rand is None:
+            rand = self.rng.random()
+        if rand > (1 - self.transmission_rate) ** infected_neighbors:
             infected_ls.add(vertex)
 
     def recover_event(self, vertex, recover_ls, recover_time):
@@ -169,27 +293,47 @@ class SirReedFrost(object):
         if recover_time[vertex] == self.time:
             recover_ls.append(vertex)
 
+    def snapshot(self):
+        """Return the current counts as a snapshot"""
+        return Snapshot(self.count, self.time, self.get_susceptible(), self.get_infected(), self.get_recovered())
+
+    def nodes(self, code):
+        """Return the set of nodes in a state, built from the state array"""
+        return set(np.flatnonzero(self.state == code).tolist())
+
+    @property
+    def susceptible(self):
+        return self.nodes(SUSCEPTIBLE)
+
+    @property
+    def infected(self):
+        return self.nodes(INFECTED[0])
+
+    @property
+    def recovered(self):
+        return self.nodes(RECOVERED[0])
+
     def get_all(self):
         """Return the number of all nodes"""
-        return len(self.graph.vs)
+        return self.graph.vcount()
 
     def get_susceptible(self):
         """Return the number of susceptible nodes at a time"""
-        return len(self.susceptible)
+        return self.counts[SUSCEPTIBLE]
 
     def get_infected(self):
         """Return the number of infected nodes at a time"""
-        return len(self.infected)
+        return self.counts[INFECTED[0]]
 
     def get_recovered(self):
         """Return the number of recovered nodes at a time"""
-        return len(self.recovered)
+        return self.counts[RECOVERED[0]]
 
     def plot(self):
         """Plot the sir process w.r.t. time"""
-        plt.plot(range(self.time + 1), self.susceptible_history, label="Susceptible")
-        plt.plot(range(self.time + 1), self.infected_history, label="Infected")
-        plt.plot(range(self.time + 1), self.recovered_history, label="Recovered")
+        plt.plot(self.recorder.step, self.susceptible_history, label="Susceptible")
+        plt.plot(self.recorder.step, self.infected_history, label="Infected")
+        plt.plot(self.recorder.step, self.recovered_history, label="Recovered")
         plt.legend()
         plt.show()
 
@@ -198,12 +342,20 @@ class SirODE(object):
     """Using ODE to solve sir model"""
 
     def __init__(self, size=10000, infection_rate=0.02, recover_rate=0.01, stop_time=None,
-                 verbose=True):
-        """Initialize the graph"""
+                 verbose=True, adaptive=False, grid=None, extinction=0.5, profiler=None):
+        """Initialize the graph
+
+        With adaptive, the model is solved by solve_ivp, keeping its own steps or the requested grid, and stops once
+        fewer than extinction nodes are infected.
+        """
         self.size = size
         self.infection_rate = infection_rate
         self.recover_rate = recover_rate
         self.verbose = verbose
+        self.adaptive = adaptive
+        self.grid = grid
+        self.extinction = extinction
+        self.profiler = profiler
         if stop_time is None:
             self.stop_time = 10000
         else:
@@ -220,10 +372,57 @@ class SirODE(object):
             drdt = gamma * i
             return dsdt, didt, drdt
 
+        def extinct(t, y, *rates):
+            """Cross zero when the infection dies out"""
+            return y[1] - self.extinction
+
+        extinct.terminal = True
+        extinct.direction = -1
+
         y0 = (self.size - 1, 1, 0)
 
-        self.time_history = np.linspace(0, self.stop_time, 100000)
-        self.history = odeint(deriv, y0, self.time_history)
+        if self.profiler is not None:
+            start = self.profiler.clock()
+        if self.adaptive:
+            solution = solve_ivp(sir_deriv, (0, self.stop_time), y0, t_eval=self.grid, events=extinct, rtol=1e-8,
+                                 atol=1e-6, args=(self.size, self.infection_rate, self.recover_rate))
+            self.time_history = solution.t
+            self.history = solution.y.T
+        else:
+            self.time_history = np.linspace(0, self.stop_time, 100000)
+            self.history = odeint(deriv, y0, self.time_history)
+        if self.profiler is not None:
+            self.profiler.add_time("solve", start)
+            self.profiler.add("points", len(self.time_history))
+            self.profiler.step(self)
+
+    def steps(self, stop=None):
+        """Yield a snapshot after every step of an adaptive solver, until fewer than extinction nodes are infected,
+        stop_time is reached or stop(model, snapshot) holds
+
+        The steps taken are kept in time_history and history, as after run.
+        """
+        solver = RK45(lambda t, y: sir_deriv(t, y, self.size, self.infection_rate, self.recover_rate), 0,
+                      (self.size - 1., 1., 0.), self.stop_time, rtol=1e-8, atol=1e-6)
+        time_history, history = [solver.t], [solver.y]
+        count = 0
+        try:
+            while solver.status == "running":
+                solver.step()
+                count += 1
+                time_history.append(solver.t)
+                history.append(solver.y)
+                s, i, r = solver.y.tolist()
+                snapshot = Snapshot(count, float(solver.t), s, i, r)
+                yield snapshot
+                if i < self.extinction or (stop is not None and stop(self, snapshot)):
+                    break
+        finally:
+            self.time_history, self.history = np.array(time_history), np.array(history)
+
+    def get_all(self):
+        """Return the number of all nodes"""
+        return self.size
 
     def plot(self):
         """Plot the graph w.r.t. the time"""
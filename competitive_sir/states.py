@@ -0,0 +1,5 @@
+# Node state codes shared by the engines, with one infected and one recovered code per competing epidemic
+SUSCEPTIBLE = 0
+INFECTED = (1, 2)
+RECOVERED = (3, 4)
+REMOVED = 5
@@ -0,0 +1,85 @@
+import json
+import os
+
+import numpy as np
+
+
+def _parameters(grid):
+    """Return the parameter points of a sweep as rows of immunity rate, transmission rates and time steps"""
+    return np.array([(point[0],) + tuple(point[1]) + tuple(point[2]) for point in grid], dtype=np.float64)
+
+
+class ResultStore(object):
+    """Outbreak sizes of a sweep, kept in .npy files of a directory and written as each run finishes
+
+    outbreaks.npy has shape (points, 2, iterations), parameters.npy holds the immunity rate, transmission rates and
+    time steps of every point and done.npy marks the runs already written, so that an interrupted sweep resumes
+    where it stopped. settings.json holds the settings of the sweep that change its outcome, such as its mode, stop
+    predicate, immunization strategy and seed, and resuming with other settings raises like a different grid does.
+    Without a path the store is kept in memory, and without a grid an existing store is opened read-only and
+    memory-mapped for analysis.
+    """
+
+    def __init__(self, path, grid=None, iterations=None, settings=None):
+        self.path = path
+        # compare settings as they read back from json, with tuples turned into lists
+        self.settings = json.loads(json.dumps(settings))
+        if grid is None:
+            with open(os.path.join(path, "settings.json")) as settings_file:
+                self.settings = json.load(settings_file)
+            self.parameters = np.load(self.filename("parameters"))
+            self.outbreaks = np.load(self.filename("outbreaks"), mmap_mode="r")
+            self.done = np.load(self.filename("done"), mmap_mode="r")
+        else:
+            self.parameters = _parameters(grid)
+            shape = (len(grid), 2, iterations)
+            if path is None:
+                self.outbreaks = np.full(shape, -1, dtype=np.int64)
+                self.done = np.zeros((len(grid), iterations), dtype=bool)
+            elif os.path.exists(self.filename("parameters")):
+                self.outbreaks = np.load(self.filename("outbreaks"), mmap_mode="r+")
+                self.done = np.load(self.filename("done"), mmap_mode="r+")
+                with open(os.path.join(path, "settings.json")) as settings_file:
+                    stored = json.load(settings_file)
+                if (self.outbreaks.shape != shape or stored != self.settings or
+                        not np.array_equal(np.load(self.filename("parameters")), self.parameters)):
+                    raise ValueError("The store at {} holds a different sweep".format(path))
+            else:
+                os.makedirs(path, exist_ok=True)
+                self.outbreaks = np.lib.format.open_memmap(self.filename("outbreaks"), mode="w+", dtype=np.int64,
+                                                           shape=shape)
+                self.outbreaks[:] = -1
+                self.done = np.lib.format.open_memmap(self.filename("done"), mode="w+", dtype=bool,
+                                                      shape=(len(grid), iterations))
+                self.flush()
+                with open(os.path.join(path, "settings.json"), "w") as out:
+                    json.dump(self.settings, out)
+                # parameters.npy is written last, so that its presence means the store is complete
+                np.save(self.filename("parameters"), self.parameters)
+        self.index = dict((tuple(point), index) for index, point in enumerate(self.parameters.tolist()))
+
+    def filename(self, name):
+        """Return the path of one of the store's arrays"""
+        return os.path.join(self.path, name + ".npy")
+
+    def flush(self):
+        """Write the memory-mapped arrays to disk"""
+        for array in (self.outbreaks, self.done):
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def complete(self, rows, columns):
+        """Return whether the runs at the given points and iterations, indexed like done, are all written"""
+        return bool(np.all(self.done[rows, columns]))
+
+    def write(self, rows, columns, outbreaks):
+        """Write the outbreak sizes of some runs, indexed like done, and mark them as done once they are on disk"""
+        self.outbreaks[rows, :, columns] = outbreaks
+        self.flush()
+        self.done[rows, columns] = True
+        self.flush()
+
+    def get(self, immunity_rate, transmission_rate, time_step):
+        """Return the outbreak sizes of one parameter point, shaped (2, iterations)"""
+        point = tuple(_parameters([(immunity_rate, transmission_rate, time_step)])[0].tolist())
+        return self.outbreaks[self.index[point]]
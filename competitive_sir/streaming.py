@@ -0,0 +1,61 @@
+from collections import namedtuple
+
+Snapshot = namedtuple("Snapshot", ("step", "time", "susceptible", "infected", "recovered"))
+Snapshot.__doc__ = """State of a model after one step, infected and recovered being pairs in competitive models"""
+
+
+def _select(value, epidemic):
+    """Return the count of one epidemic, or the count of a single epidemic model"""
+    return value if epidemic is None else value[epidemic]
+
+
+class OutbreakFraction(object):
+    """Stop once an epidemic has reached more than a fraction of all the nodes"""
+
+    def __init__(self, fraction, epidemic=None):
+        self.fraction = fraction
+        self.epidemic = epidemic
+
+    def __call__(self, model, snapshot):
+        reached = _select(snapshot.infected, self.epidemic) + _select(snapshot.recovered, self.epidemic)
+        return reached > self.fraction * model.get_all()
+
+
+class Extinct(object):
+    """Stop once an epidemic has no infected node left, so that its outbreak size is final"""
+
+    def __init__(self, epidemic=None):
+        self.epidemic = epidemic
+
+    def __call__(self, model, snapshot):
+        return _select(snapshot.infected, self.epidemic) == 0
+
+
+class TimeLimit(object):
+    """Stop once the simulated time reaches a limit"""
+
+    def __init__(self, time):
+        self.time = time
+
+    def __call__(self, model, snapshot):
+        return snapshot.time >= self.time
+
+
+class StepLimit(object):
+    """Stop after a number of events or generations"""
+
+    def __init__(self, steps):
+        self.steps = steps
+
+    def __call__(self, model, snapshot):
+        return snapshot.step >= self.steps
+
+
+class AnyOf(object):
+    """Stop once any of the predicates holds"""
+
+    def __init__(self, *predicates):
+        self.predicates = predicates
+
+    def __call__(self, model, snapshot):
+        return any(predicate(model, snapshot) for predicate in self.predicates)
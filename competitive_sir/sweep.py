@@ -0,0 +1,148 @@
+import itertools
+import json
+from multiprocessing import Pool
+
+import igraph as ig
+import numpy as np
+
+from competitive_sir import competitive, kernels
+from competitive_sir.adjacency import as_adjacency
+from competitive_sir.batch import BatchReedFrost
+from competitive_sir.history import FinalOnly
+from competitive_sir.percolation import PercolationReedFrost
+from competitive_sir.store import ResultStore
+
+_graph = None
+
+
+def _init_worker(graph):
+    """Keep the network of the sweep in the worker, so that it is sent once per worker"""
+    global _graph
+    _graph = graph
+
+
+def _run_point(task):
+    """Run all iterations of one parameter point with its own random stream"""
+    immunity_rate, transmission_rate, time_step, iterations, batch, seed, stop, strategy, seeds = task
+    rng = np.random.default_rng(seed)
+    if batch:
+        epidemic = BatchReedFrost(_graph, replicas=iterations, time_step=time_step,
+                                  transmission_rate=transmission_rate, immunity_rate=immunity_rate, verbose=False,
+                                  seed=rng, seeds=seeds)
+        epidemic.run()
+        return epidemic.get_recovered(0), epidemic.get_recovered(1)
+    result = np.zeros((2, iterations), dtype=np.int64)
+    for iteration in range(iterations):
+        epidemic = competitive.ImmunizationReedFrost(_graph, time_step=time_step, transmission_rate=transmission_rate,
+                                                     immunity_rate=immunity_rate, verbose=False, frontier=True,
+                                                     recording=FinalOnly(), seed=rng, strategy=strategy, seeds=seeds)
+        epidemic.run(stop)
+        result[:, iteration] = epidemic.get_recovered(0), epidemic.get_recovered(1)
+    return result
+
+
+def _run_replica(task):
+    """Run one percolation sample of a transmission and time step point over every immunity rate"""
+    immunity_rate, transmission_rate, time_step, seed, strategy, seeds = task
+    return PercolationReedFrost(_graph, time_step, transmission_rate, seed, strategy, seeds).curve(immunity_rate)
+
+
+def _keyed(task):
+    """Run a task function and return its result along with the key of the task"""
+    function, key, arguments = task
+    return key, function(arguments)
+
+
+def _imap(function, tasks, graph, processes):
+    """Yield the keyed results of (key, arguments) tasks as they finish, in workers holding the network or here"""
+    tasks = ((function, key, arguments) for key, arguments in tasks)
+    if processes == 1:
+        _init_worker(graph)
+        for task in tasks:
+            yield _keyed(task)
+        return
+    with Pool(processes, initializer=_init_worker, initargs=(graph,)) as pool:
+        for result in pool.imap_unordered(_keyed, tasks):
+            yield result
+
+
+def _describe(value):
+    """Return a json description of a setting such as a stop predicate or a strategy, by its class and attributes"""
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, (tuple, list, np.ndarray)):
+        return list(_describe(item) for item in value)
+    if not hasattr(value, "__dict__"):
+        return repr(value)
+    return dict([("class", type(value).__name__)] +
+                list((name, _describe(attribute)) for name, attribute in sorted(vars(value).items())))
+
+
+def parameter_grid(immunity_rate=(0.,), transmission_rate=((0.1, 0.2),), time_step=((1., 2.01),)):
+    """Return all the (immunity_rate, transmission_rate, time_step) combinations"""
+    return list(itertools.product(immunity_rate, (tuple(rate) for rate in transmission_rate),
+                                  (tuple(step) for step in time_step)))
+
+
+def immunization_sweep(graph: ig.Graph, immunity_rate=(0.,), transmission_rate=((0.1, 0.2),),
+                       time_step=((1., 2.01),), iterations=50, processes=None, seed=None, batch=False, stop=None,
+                       common=False, store=None, strategy=None, seeds=1):
+    """Run competitive sir with immunization on every parameter point and return the outbreak sizes
+
+    The result has shape (points, 2, iterations), with points ordered as in parameter_grid. Each point draws from
+    its own stream spawned from seed, so the result does not depend on the number of processes. A stop predicate,
+    such as streaming.Extinct(1), cuts every run short and records the outbreak sizes reached by then.
+
+    With common, every iteration of a transmission and time step point is one percolation sample, with fixed open
+    edges, seeds and immunization order, read off at every immunity rate. The levels then share their random
+    numbers, which smooths the curve over immunity rates and reuses the work between neighboring levels.
+
+    With store, a directory or a ResultStore, the outbreak sizes are written to disk as each task finishes, and the
+    runs already in the store are skipped, so that an interrupted sweep resumes; the store must come from a sweep
+    with the same grid, mode, stop, strategy, seeds and seed, and with numba available or not as it was. A strategy
+    from the immunization module picks the immunized nodes instead of uniform draws with replacement, and each
+    epidemic starts from seeds random nodes.
+    """
+    if batch and stop is not None:
+        raise ValueError("The batch engine runs all iterations together and cannot stop them one by one")
+    if common and (batch or stop is not None):
+        raise ValueError("Common random numbers read whole percolation samples and take neither batch nor stop")
+    if batch and strategy is not None:
+        raise ValueError("The batch engine only draws immunized nodes uniformly with replacement")
+    graph = as_adjacency(graph)
+    grid = parameter_grid(immunity_rate, transmission_rate, time_step)
+    mode = "common" if common else "batch" if batch else "runs"
+    # only the runs mode goes through the compiled kernels, whose random streams differ from numpy's
+    settings = dict(mode=mode, stop=_describe(stop), strategy=_describe(strategy), seeds=seeds,
+                    seed=_describe(seed), compiled=kernels.AVAILABLE if mode == "runs" else None)
+    if not isinstance(store, ResultStore):
+        store = ResultStore(store, grid, iterations, settings)
+    elif store.settings != json.loads(json.dumps(settings)):
+        raise ValueError("The store holds a sweep with other settings")
+    if common:
+        rates = np.asarray(immunity_rate, dtype=np.float64)
+        points = list(point[1:] for point in parameter_grid((0.,), transmission_rate, time_step))
+        streams = np.random.SeedSequence(seed).spawn(len(points) * iterations)
+        tasks = []
+        for pair, (rate, step) in enumerate(points):
+            rows = np.arange(pair, len(grid), len(points))
+            for iteration in range(iterations):
+                if not store.complete(rows, iteration):
+                    replica_seed = streams[pair * iterations + iteration]
+                    tasks.append(((rows, iteration), (rates, rate, step, replica_seed, strategy, seeds)))
+        function = _run_replica
+    else:
+        streams = np.random.SeedSequence(seed).spawn(len(grid))
+        tasks = list(((index, slice(None)), point + (iterations, batch, point_seed, stop, strategy, seeds))
+                     for index, (point, point_seed) in enumerate(zip(grid, streams))
+                     if not store.complete(index, slice(None)))
+        function = _run_point
+    for (rows, columns), outbreaks in _imap(function, tasks, graph, processes):
+        store.write(rows, columns, outbreaks)
+    return np.array(store.outbreaks)
+
+
+def save_json(result, filename):
+    """Save the outbreak sizes of a sweep as nested lists"""
+    with open(filename, "w") as out:
+        json.dump(np.asarray(result).tolist(), out)
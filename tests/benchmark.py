@@ -0,0 +1,100 @@
+import argparse
+import json
+import platform
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from competitive_sir import sir, competitive, kernels
+from competitive_sir.adjacency import Adjacency
+from tests.data_loader import MODELS
+
+ENGINES = {
+    "sir_naive": lambda network, seed: sir.SirNaive(network, verbose=False, seed=seed, compiled=False),
+    "sir_reed_frost": lambda network, seed: sir.SirReedFrost(network, verbose=False, seed=seed, compiled=False),
+    "competitive_reed_frost": lambda network, seed: competitive.SirReedFrost(network, verbose=False, seed=seed,
+                                                                             compiled=False),
+    "competitive_frontier": lambda network, seed: competitive.SirReedFrost(network, verbose=False, seed=seed,
+                                                                           frontier=True, compiled=False),
+    "competitive_next_reaction": lambda network, seed: competitive.SirNextReaction(network, verbose=False, seed=seed),
+    "competitive_immunization": lambda network, seed: competitive.ImmunizationReedFrost(
+        network, immunity_rate=.5, verbose=False, seed=seed, compiled=False),
+    "competitive_multi": lambda network, seed: competitive.SirMultiReedFrost(
+        network, time_step=(1., 2., 2., 3.), transmission_rate=(.1, .2, .15, .3), verbose=False, seed=seed,
+        compiled=False),
+    "sir_ode": lambda network, seed: sir.SirODE(network.vcount(), verbose=False),
+    "competitive_ode": lambda network, seed: competitive.SirODE(network.vcount(), verbose=False),
+}
+
+# the compiled kernels ignore frontier, so a single compiled row covers both Reed Frost generation styles
+if kernels.AVAILABLE:
+    ENGINES.update({
+        "sir_naive_compiled": lambda network, seed: sir.SirNaive(network, verbose=False, seed=seed, compiled=True),
+        "sir_reed_frost_compiled": lambda network, seed: sir.SirReedFrost(network, verbose=False, seed=seed,
+                                                                          compiled=True),
+        "competitive_reed_frost_compiled": lambda network, seed: competitive.SirReedFrost(
+            network, verbose=False, seed=seed, compiled=True),
+        "competitive_immunization_compiled": lambda network, seed: competitive.ImmunizationReedFrost(
+            network, immunity_rate=.5, verbose=False, seed=seed, compiled=True),
+        "competitive_multi_compiled": lambda network, seed: competitive.SirMultiReedFrost(
+            network, time_step=(1., 2., 2., 3.), transmission_rate=(.1, .2, .15, .3), verbose=False, seed=seed,
+            compiled=True),
+    })
+
+
+def measure(engine, network, seed, memory=False):
+    """Run one simulation and return its wall time, number of events or generations and peak memory"""
+    epidemic = ENGINES[engine](network, seed)
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    epidemic.run()
+    wall_time = time.perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    steps = getattr(epidemic, "count", None)
+    if steps is None:
+        steps = len(epidemic.time_history)
+    return wall_time, steps, peak
+
+
+def benchmark(engines=tuple(ENGINES), models=tuple(MODELS), sizes=(1000, 3000, 10000), degree=26, repeats=3,
+              memory=True, seed=0):
+    """Time every engine on every synthetic network and return one record per (engine, model, size)"""
+    records = []
+    for model in models:
+        for size in sizes:
+            random.seed(seed)
+            network = Adjacency.from_graph(MODELS[model](size, size * degree // 2, verbose=False))
+            for engine in engines:
+                runs = list(measure(engine, network, seed + repeat) for repeat in range(repeats))
+                wall_time = float(np.median(list(run[0] for run in runs)))
+                steps = float(np.median(list(run[1] for run in runs)))
+                record = {"engine": engine, "model": model, "size": size, "edges": network.ecount(),
+                          "repeats": repeats, "wall_time": wall_time, "steps": steps,
+                          "steps_per_second": steps / wall_time if wall_time > 0 else None,
+                          "peak_memory": measure(engine, network, seed, memory=True)[2] if memory else None}
+                print("{engine:>33} {model:>12} {size:>7} {wall_time:10.4f}s {steps:10.0f} steps".format(**record))
+                records.append(record)
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sir and competitive sir engines")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--models", nargs="+", default=list(MODELS), choices=list(MODELS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=[1000, 3000, 10000])
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-memory", dest="memory", action="store_false")
+    parser.add_argument("--output", default="benchmark.json")
+    args = parser.parse_args()
+    results = {"python": platform.python_version(), "numpy": np.__version__, "compiled": kernels.AVAILABLE,
+               "time": time.time(),
+               "records": benchmark(args.engines, args.models, args.sizes, repeats=args.repeats,
+                                    memory=args.memory)}
+    with open(args.output, "w") as out:
+        json.dump(results, out, indent=1)
@@ -1,9 +1,36 @@
 import os
 import random
+from multiprocessing import Pool
 import igraph as ig
+import numpy as np
+from competitive_sir.adjacency import Adjacency
+from competitive_sir.graph_cache import load_network
 from competitive_sir.property import get_threhsold
 
-def map_loader(name, verbose=True):
+CACHE_DIR = "tests/test_data/.cache"
+
+
+def file_loader(filename, verbose=True, adjacency=False, cache_dir=CACHE_DIR):
+    """Load a network file as a graph or as an adjacency snapshot, with statistics from the binary cache"""
+    if cache_dir is None:
+        graph = ig.Graph.Load(filename)
+        if verbose:
+            print("Number of nodes:", len(graph.vs))
+            print("Number of edges:", len(graph.es))
+            print("Transmission threshold:", get_threhsold(graph))
+        return graph
+    edges, snapshot, stats = load_network(filename, cache_dir)
+    if verbose:
+        print("Number of nodes:", stats["nodes"])
+        print("Number of edges:", stats["edges"])
+        print("Transmission threshold:", stats["threshold"])
+    if adjacency:
+        return snapshot
+    # igraph parses the text faster than it builds a graph from the cached edges
+    return ig.Graph.Load(filename)
+
+
+def map_loader(name, verbose=True, adjacency=False, cache_dir=CACHE_DIR):
     """Load a network"""
     facebook_pages = ["artist", "athletes", "company", "government", "new_sites", "politician", "public_figure",
                       "tv_show"]
@@ -13,21 +40,11 @@ def map_loader(name, verbose=True):
     name2file.update(zip(other_names, ("tests/test_data/" + file for file in other_files)))
 
     if name in name2file:
-        graph = ig.Graph.Load(name2file[name])
-        if verbose:
-            print("Number of nodes:", len(graph.vs))
-            print("Number of edges:", len(graph.es))
-            print("Transmission threshold:", get_threhsold(graph))
-        return graph
+        return file_loader(name2file[name], verbose, adjacency, cache_dir)
     elif name == "school":
         filenames = list(f for f in os.listdir("tests/test_data/facebook_schools") if f.endswith(".txt"))
         filename = random.choice(filenames)
-        graph = ig.Graph.Load("tests/test_data/facebook_schools/" + filename)
-        if verbose:
-            print("Number of nodes:", len(graph.vs))
-            print("Number of edges:", len(graph.es))
-            print("Transmission threshold:", get_threhsold(graph))
-        return graph
+        return file_loader("tests/test_data/facebook_schools/" + filename, verbose, adjacency, cache_dir)
 
 
 def power_law(size=7000, edge=90000, alpha=2.6, verbose=True):
@@ -58,3 +75,38 @@ def erdos_renyi(size=7000, edges=90000, verbose=True):
         print("Number of edges:", len(graph.es))
         print("Transmission threshold:", get_threhsold(graph))
     return graph
+
+
+MODELS = {"power_law": power_law, "small_world": small_world, "erdos_renyi": erdos_renyi}
+
+
+def _generate(task):
+    """Generate one network of a model with its own seed and return its adjacency snapshot
+
+    The global random state is restored afterwards, since with processes=1 it is the caller's.
+    """
+    model, arguments, seed = task
+    state = random.getstate()
+    try:
+        random.seed(seed)
+        return Adjacency.from_graph(MODELS[model](verbose=False, **arguments))
+    finally:
+        random.setstate(state)
+
+
+def ensemble(model="power_law", count=100, processes=None, seed=None, **arguments):
+    """Yield the adjacency snapshots of count random networks of a model, generated in worker processes
+
+    Networks come in order as soon as they are ready, so that simulating one overlaps with generating the next ones.
+    Each network is seeded from its own stream spawned from seed, so the ensemble does not depend on processes.
+    arguments are passed on to the model, such as size, edge and alpha for power_law.
+    """
+    seeds = list(int(child.generate_state(1)[0]) for child in np.random.SeedSequence(seed).spawn(count))
+    tasks = ((model, arguments, network_seed) for network_seed in seeds)
+    if processes == 1:
+        for task in tasks:
+            yield _generate(task)
+        return
+    with Pool(processes) as pool:
+        for snapshot in pool.imap(_generate, tasks):
+            yield snapshot
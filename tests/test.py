@@ -1,4 +1,10 @@
+import logging
+
+import numpy as np
+
 from competitive_sir import sir, competitive
+from competitive_sir.profiler import Profiler
+from competitive_sir.streaming import OutbreakFraction
 from tests.data_loader import map_loader
 
 
@@ -10,9 +16,10 @@ def test_sir_naive(network, infection_rate=.002, recover_rate=.01, verbose=False
         epidemic.plot_count()
 
 
-def test_sir_ode(size, infection_rate=.02, recover_rate=.01, verbose=False, plot=False):
+def test_sir_ode(size, infection_rate=.02, recover_rate=.01, verbose=False, plot=False, adaptive=False):
     """Run ode on network"""
-    epidemic = sir.SirODE(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose)
+    epidemic = sir.SirODE(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose,
+                          adaptive=adaptive)
     epidemic.run()
     if plot:
         epidemic.plot()
@@ -36,6 +43,25 @@ def test_competitive_reed_frost(network, time_step=(1., 2.), transmission_rate=(
         epidemic.plot()
 
 
+def test_competitive_frontier(network, time_step=(1., 2.), transmission_rate=(.1, .2), verbose=False, plot=False):
+    """Run competitve reedfrost on network, only visiting neighbors of infected nodes"""
+    epidemic = competitive.SirReedFrost(network, time_step=time_step, transmission_rate=transmission_rate,
+                                        verbose=verbose, frontier=True)
+    epidemic.run()
+    if plot:
+        epidemic.plot()
+
+
+def test_competitive_next_reaction(network, infection_rate=(.002, .003), recover_rate=(.01, .01), verbose=False,
+                                   plot=False, seeds=1):
+    """Run event driven competitive sir on network"""
+    epidemic = competitive.SirNextReaction(network, infection_rate=infection_rate, recover_rate=recover_rate,
+                                           verbose=verbose, seeds=seeds)
+    epidemic.run()
+    if plot:
+        epidemic.plot()
+
+
 def test_competitive_immunization(network, time_step=(1., 2.), transmission_rate=(.1, .2), immunity_rate=.5,
                                   verbose=False,
                                   plot=False):
@@ -47,18 +73,81 @@ def test_competitive_immunization(network, time_step=(1., 2.), transmission_rate
         epidemic.plot()
 
 
-def test_competitive_ode(size, infection_rate=(.02, .03), recover_rate=(.01, .01), verbose=False, plot=False):
+def test_competitive_multi(network, time_step=(1., 2., 2., 3.), transmission_rate=(.1, .2, .15, .3), immunity_rate=.2,
+                           verbose=False, plot=False):
+    """Run reedfrost with any number of competing epidemics and immunization on network"""
+    epidemic = competitive.SirMultiReedFrost(network, time_step=time_step, transmission_rate=transmission_rate,
+                                             immunity_rate=immunity_rate, verbose=verbose)
+    epidemic.run()
+    assert epidemic.get_susceptible() + sum(epidemic.recovered_counts) + epidemic.get_removed() == epidemic.get_all()
+    if plot:
+        epidemic.plot()
+
+
+def test_competitive_ode(size, infection_rate=(.02, .03), recover_rate=(.01, .01), verbose=False, plot=False,
+                         adaptive=False):
     """Run competitive ode on network"""
-    epidemic = competitive.SirODE(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose)
+    epidemic = competitive.SirODE(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose,
+                                  adaptive=adaptive)
     epidemic.run()
     if plot:
         epidemic.plot()
 
 
+def test_competitive_ode_batch(size, infection_rate=(np.linspace(.005, .05, 30)[:, None], np.linspace(.005, .05, 30)),
+                               recover_rate=(.01, .01), verbose=False):
+    """Run competitive ode for a grid of infection rates at once and return the final outbreak sizes"""
+    epidemic = competitive.SirODEBatch(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose)
+    epidemic.run()
+    return epidemic.get_recovered(0), epidemic.get_recovered(1)
+
+
+def test_competitive_ode_batch_streaming(size, infection_rate=(np.linspace(.005, .05, 10), .03),
+                                         recover_rate=(.01, .01), fraction=.2, verbose=False):
+    """Step competitive ode for many infection rates until epidemic 0 reaches a fraction of the nodes in every set"""
+    epidemic = competitive.SirODEBatch(size, infection_rate=infection_rate, recover_rate=recover_rate, verbose=verbose)
+    snapshots = list(epidemic.steps(OutbreakFraction(fraction, 0)))
+    assert np.array_equal(snapshots[-1].susceptible, epidemic.get_susceptible())
+    assert epidemic.history.shape == (5, 10, len(epidemic.time_history))
+    return snapshots
+
+
+def test_competitive_profile(network, time_step=(1., 2.), transmission_rate=(.1, .2), frontier=False):
+    """Run competitive reedfrost on network with a profiler and log where the time goes"""
+    profiler = Profiler()
+    epidemic = competitive.SirReedFrost(network, time_step=time_step, transmission_rate=transmission_rate,
+                                        verbose=False, frontier=frontier, profiler=profiler)
+    epidemic.run()
+    profiler.report()
+    assert profiler.count == epidemic.count
+    assert sum(step.get("infections", 0) for step in profiler.steps) == epidemic.get_all() - 2 - \
+        epidemic.get_susceptible()
+    return profiler.summary()
+
+
+def test_competitive_streaming(network, time_step=(1., 2.), transmission_rate=(.1, .2), fraction=.2, verbose=False):
+    """Step competitive reedfrost on network until epidemic 0 reaches a fraction of the nodes"""
+    epidemic = competitive.SirReedFrost(network, time_step=time_step, transmission_rate=transmission_rate,
+                                        verbose=verbose, frontier=True)
+    snapshots = list(epidemic.steps(OutbreakFraction(fraction, 0)))
+    assert snapshots[-1] == epidemic.snapshot()
+    assert list(snapshot.susceptible for snapshot in snapshots) == epidemic.susceptible_history[1:].tolist()
+    reached = epidemic.get_infected(0) + epidemic.get_recovered(0)
+    assert reached > fraction * epidemic.get_all() or (epidemic.get_infected(0) == 0 and
+                                                       epidemic.get_infected(1) == 0)
+    return snapshots
+
+
 if __name__ == "__main__":
-    network = map_loader("government")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    network = map_loader("government", adjacency=True)
     for test in [test_sir_naive, test_sir_redd_frost, test_competitive_reed_frost,
-                 test_competitive_immunization]:
+                 test_competitive_frontier, test_competitive_next_reaction, test_competitive_immunization,
+                 test_competitive_multi]:
         test(network, verbose=True, plot=True)
     for test in [test_sir_ode, test_competitive_ode]:
-        test(len(network.vs), verbose=True, plot=True)
+        test(network.vcount(), verbose=True, plot=True)
+    test_competitive_ode_batch(network.vcount(), verbose=True)
+    test_competitive_ode_batch_streaming(network.vcount(), verbose=True)
+    test_competitive_profile(network)
+    test_competitive_streaming(network, verbose=True)
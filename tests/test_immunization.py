@@ -1,25 +1,69 @@
 from __future__ import division
+import logging
 from competitive_sir import competitive
-from tests.data_loader import map_loader
+from competitive_sir.adjacency import as_adjacency
+from competitive_sir.batch import BatchReedFrost
+from competitive_sir.history import FinalOnly
+from competitive_sir.percolation import percolation_curve
+from competitive_sir.property import DegreeDistribution
+from competitive_sir.sweep import immunization_sweep
+from tests.data_loader import ensemble, map_loader
 import numpy as np
-import json
 
 
-def test_immunization(network, time_step=(10, 20), transmission_rate=(0.1, 0.2), immunity_rate=.5, iterations=50):
+def test_immunization(network, time_step=(10, 20), transmission_rate=(0.1, 0.2), immunity_rate=.5, iterations=50,
+                      frontier=True, seed=None, seeds=1, strategy=None):
     """Run simulations of competitive sir with immunization and return the number of infected nodes"""
+    network = as_adjacency(network)
+    rng = np.random.default_rng(seed)
     result = [], []
     for iter in range(iterations):
         epidemic = competitive.ImmunizationReedFrost(network, time_step=time_step, transmission_rate=transmission_rate,
-                                                     immunity_rate=immunity_rate, verbose=False)
+                                                     immunity_rate=immunity_rate, verbose=False,
+                                                     frontier=frontier, recording=FinalOnly(), seed=rng,
+                                                     seeds=seeds, strategy=strategy)
         epidemic.run()
         result[0].append(epidemic.get_recovered(0))
         result[1].append(epidemic.get_recovered(1))
     return result
 
 
+def test_immunization_batch(network, time_step=(10, 20), transmission_rate=(0.1, 0.2), immunity_rate=.5,
+                            iterations=50, seed=None, seeds=1):
+    """Run all the simulations of competitive sir with immunization at once and return the number of infected nodes"""
+    epidemic = BatchReedFrost(network, replicas=iterations, time_step=time_step, transmission_rate=transmission_rate,
+                              immunity_rate=immunity_rate, verbose=False, seed=seed, seeds=seeds)
+    epidemic.run()
+    return epidemic.get_recovered(0).tolist(), epidemic.get_recovered(1).tolist()
+
+
+def test_immunization_percolation(network, time_step=(10, 20), transmission_rate=(0.1, 0.2),
+                                  immunity_rate=np.linspace(0, 1., 100), iterations=50, seed=None, strategy=None,
+                                  seeds=1):
+    """Estimate the number of infected nodes at every immunity rate at once from percolation samples"""
+    return percolation_curve(network, immunity_rate=immunity_rate, time_step=time_step,
+                             transmission_rate=transmission_rate, replicas=iterations, seed=seed,
+                             strategy=strategy, seeds=seeds).tolist()
+
+
+def test_immunization_ensemble(model, count=20, time_step=(10, 20), transmission_rate=(0.1, 0.2),
+                               immunity_rate=np.linspace(0, 1., 100), iterations=5, seed=None, **arguments):
+    """Estimate the number of infected nodes at every immunity rate over an ensemble of random networks"""
+    rng = np.random.default_rng(seed)
+    curves = list(percolation_curve(network, immunity_rate=immunity_rate, time_step=time_step,
+                                    transmission_rate=transmission_rate, replicas=iterations, seed=rng)
+                  for network in ensemble(model, count, seed=seed, **arguments))
+    return np.concatenate(curves, axis=2).tolist()
+
+
+def test_immunization_threshold(network, transmission_rate=(0.1, 0.2)):
+    """Return the immunity rate above which each epidemic cannot spread, from the degree distribution"""
+    return DegreeDistribution.from_graph(network).immunization_threshold(transmission_rate).tolist()
+
+
 if __name__ == "__main__":
-    network = map_loader("government")
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    network = map_loader("government", adjacency=True)
     x = np.linspace(0, 1., 100)
-    infections = list(test_immunization(network, time_step=(10, 20), immunity_rate=xx) for xx in x)
-    with open("immunization_prob.json", "w") as out:
-        json.dump(infections, out)
+    immunization_sweep(network, immunity_rate=x, time_step=[(10, 20)], iterations=50, common=True,
+                       store="immunization_prob")